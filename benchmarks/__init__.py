@@ -0,0 +1,6 @@
+#
+# SPDX-FileCopyrightText: 2017-now, See `CONTRIBUTORS.lst`
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+"""Benchmarks as a package."""
@@ -0,0 +1,111 @@
+#
+# SPDX-FileCopyrightText: 2017-now, See `CONTRIBUTORS.lst`
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+"""Measure the plugin import time with ``python -X importtime``.
+
+Usage::
+
+    python benchmarks/import_time.py [--repeat N] [--top N] [--max-ms MS]
+
+The plugin is imported after ``pytest``, the same way ``pytest`` loads it, so
+only modules imported by the plugin itself are accounted. The script exits with
+a non-zero code if the import takes longer than ``--max-ms`` or if any module
+that has to be imported lazily gets imported.
+"""
+
+from __future__ import annotations
+
+# Standard imports
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Final
+
+PLUGIN_MODULE: Final[str] = 'pytest_matcher.plugin'
+# Modules which the plugin must import only when they're really needed
+LAZY_MODULES: Final[tuple[str, ...]] = (
+    '_hashlib'
+  , 'concurrent.futures'
+  , 'difflib'
+  , 'gzip'
+  , 'hashlib'
+  , 'lzma'
+  , 'mmap'
+  , 'pygments'
+  , 'sqlite3'
+  , 'yaml'
+  )
+
+_IMPORTTIME_RE: Final[re.Pattern[str]] = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure() -> tuple[int, dict[str, int]]:
+    """Return the cumulative plugin import time and self times of imported modules (in microseconds)."""
+    output = subprocess.run(                                # NOQA: S603
+        [sys.executable, '-X', 'importtime', '-c', f'import pytest; import {PLUGIN_MODULE}']
+      , capture_output=True
+      , check=True
+      , text=True
+        # NOTE Let the first run write bytecode, so compiling sources isn't accounted.
+      , env={name: value for name, value in os.environ.items() if name != 'PYTHONDONTWRITEBYTECODE'}
+      ).stderr
+
+    total = 0
+    modules: dict[str, int] = {}
+    plugin_seen = False
+    # NOTE Modules are reported after their dependencies, so everything between
+    # the last line of `pytest` imports and the plugin line belongs to the plugin.
+    for line in reversed(output.splitlines()):
+        m = _IMPORTTIME_RE.match(line)
+        if m is None:
+            continue
+        self_us, cumulative_us, _indent, module = m.groups()
+        if module == 'pytest':
+            break
+        if module == PLUGIN_MODULE:
+            total = int(cumulative_us)
+            plugin_seen = True
+        if plugin_seen:
+            modules[module] = int(self_us)
+
+    return total, modules
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements')
+    parser.add_argument('--top', type=int, default=10, help='number of the slowest modules to show')
+    parser.add_argument('--max-ms', type=float, help='fail if the import takes longer')
+    args = parser.parse_args()
+
+    # NOTE The first run also compiles modules, so it's not accounted.
+    measure()
+    total, modules = min((measure() for _ in range(args.repeat)), key=lambda result: result[0])
+
+    sys.stdout.write(f'{PLUGIN_MODULE}: {total / 1000:.1f}ms\n')
+    for module, self_us in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        sys.stdout.write(f'{self_us / 1000:10.2f}ms  {module}\n')
+
+    status = 0
+    if eager := sorted(
+        module
+        for module in modules
+        if any(module == lazy or module.startswith(f'{lazy}.') for lazy in LAZY_MODULES)
+      ):
+        sys.stdout.write(f'Modules must be imported lazily: {", ".join(eager)}\n')
+        status = 1
+
+    if args.max_ms is not None and total / 1000 > args.max_ms:
+        sys.stdout.write(f'The import takes longer than {args.max_ms}ms\n')
+        status = 1
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
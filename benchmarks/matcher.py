@@ -0,0 +1,247 @@
+#
+# SPDX-FileCopyrightText: 2017-now, See `CONTRIBUTORS.lst`
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+"""Measure the matcher engines on synthetic inputs of growing size.
+
+Usage::
+
+    python benchmarks/matcher.py [--sizes 1K,1M,100M] [--cases eq,match] [--repeat N]
+                                 [--save-baseline FILE] [--baseline FILE] [--threshold PERCENT]
+
+With ``--save-baseline``, the results are written into a JSON file. With ``--baseline``,
+the results are compared with a previously saved file, and the script exits with a
+non-zero code if any case became slower than the threshold allows.
+"""
+
+from __future__ import annotations
+
+# Standard imports
+import argparse
+import json
+import pathlib
+import re
+import sys
+import tempfile
+import timeit
+from typing import TYPE_CHECKING, Final
+
+# Third party packages
+import yaml
+
+# Project specific imports
+from pytest_matcher.plugin import (
+    _ContentCheckOrStorePattern,
+    _ContentEditParameters,
+    _DirectoryStore,
+    _MismatchStyle,
+    _ParsedDocuments,
+    _PatternCache,
+    _YAMLCheckOrStorePattern,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+SIZE_SUFFIXES: Final[dict[str, int]] = {'K': 1024, 'M': 1024 * 1024}
+DEFAULT_SIZES: Final[str] = '1K,64K,1M'
+# Size of a pattern file used by the unused pattern files scanning case
+SCAN_FILE_SIZE: Final[int] = 4096
+
+
+def parse_size(size: str) -> int:
+    """Convert a size w/ an optional ``K`` or ``M`` suffix to bytes."""
+    multiplier = SIZE_SUFFIXES.get(size[-1:].upper(), 1)
+    return int(size[:-1] if multiplier > 1 else size) * multiplier
+
+
+def format_size(size: int) -> str:
+    """Convert bytes to a size w/ a ``K`` or ``M`` suffix."""
+    for suffix, multiplier in reversed(SIZE_SUFFIXES.items()):
+        if size >= multiplier and size % multiplier == 0:
+            return f'{size // multiplier}{suffix}'
+    return str(size)
+
+
+def make_text(size: int) -> str:
+    """Generate a log-like text of (about) the given size."""
+    lines = []
+    total = 0
+    n = 0
+    while total < size:
+        line = f'{n:08d} INFO worker-{n % 7}: processed item #{n} in {n % 1000} ms'
+        lines.append(line)
+        total += len(line) + 1
+        n += 1
+    return '\n'.join(lines) + '\n'
+
+
+def make_regex(text: str) -> str:
+    """Make a pattern matching the given text w/ durations replaced by a regex."""
+    return re.sub('in [0-9]+ ms', 'in [0-9]+ ms', '\n'.join(map(re.escape, text.splitlines())))
+
+
+def make_yaml(size: int) -> str:
+    """Generate a YAML document of (about) the given size."""
+    item_size = len(yaml.safe_dump([make_item(0)]))
+    return yaml.safe_dump({'kind': 'List', 'items': [make_item(n) for n in range(max(1, size // item_size))]})
+
+
+def make_item(n: int) -> dict[str, object]:
+    """Generate an item of the YAML document."""
+    return {
+        'name': f'item-{n}'
+      , 'index': n
+      , 'enabled': n % 2 == 0
+      , 'labels': {'app': 'benchmark', 'tier': f'tier-{n % 7}'}
+      }
+
+
+def make_checker(workdir: pathlib.Path, content: str) -> Callable[[], _ContentCheckOrStorePattern]:
+    """Write a pattern file and return a factory of checkers for it."""
+    path = workdir / 'pattern.out'
+    path.write_text(content, encoding='utf-8')
+    cache = _PatternCache(_DirectoryStore(workdir))
+    # NOTE Make a new checker every time, cuz it keeps the read pattern content.
+    return lambda: _ContentCheckOrStorePattern(path, store=False, edit=_ContentEditParameters(), cache=cache)
+
+
+def case_eq(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Compare the output w/ the pattern file content."""
+    text = make_text(size)
+    checker = make_checker(workdir, text)
+    return lambda: checker() == text
+
+
+def case_match(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Match the output w/ the regex pattern in the default mode."""
+    text = make_text(size)
+    checker = make_checker(workdir, make_regex(text))
+    return lambda: checker().match(text)
+
+
+def case_match_multiline(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Match the output w/ the regex pattern in the ``MULTILINE`` mode."""
+    text = make_text(size)
+    checker = make_checker(workdir, make_regex(text))
+    return lambda: checker().match(text, re.MULTILINE)
+
+
+def case_edit_text(_workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Edit the output before saving it as a pattern."""
+    text = make_text(size)
+    edit = _ContentEditParameters(replace_matched_lines_raw=[r'[0-9]+ ms'], drop_head=1, drop_tail=1)
+    return lambda: edit.edit_text(text)
+
+
+def case_report_full(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Make the mismatch report in the ``full`` style."""
+    text = make_text(size)
+    checker = make_checker(workdir, text)
+    actual = text.replace('worker-3', 'worker-4')
+    return lambda: checker().report_compare_mismatch(actual, color=False, style=_MismatchStyle.FULL)
+
+
+def case_report_diff(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Make the mismatch report in the ``diff`` style."""
+    text = make_text(size)
+    checker = make_checker(workdir, text)
+    actual = text.replace('worker-3', 'worker-4')
+    return lambda: checker().report_compare_mismatch(actual, color=False, style=_MismatchStyle.DIFF)
+
+
+def case_yaml(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Compare YAML documents."""
+    document = make_yaml(size)
+    expected = workdir / 'pattern.yaml'
+    expected.write_text(document, encoding='utf-8')
+    result = workdir / 'result.yaml'
+    result.write_text(document, encoding='utf-8')
+    checker = _YAMLCheckOrStorePattern(
+        expected
+      , store=False
+        # NOTE Disable the parsed documents cache to measure parsing as well.
+      , cache=_PatternCache(_DirectoryStore(workdir), documents=_ParsedDocuments(0))
+      , loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+      )
+    return lambda: checker == result
+
+
+def case_unused_scan(workdir: pathlib.Path, size: int) -> Callable[[], object]:
+    """Scan the patterns base directory for pattern files (as `--pm-reveal-unused-files` does)."""
+    content = 'x' * (SCAN_FILE_SIZE - 1) + '\n'
+    for n in range(max(1, size // SCAN_FILE_SIZE)):
+        path = workdir / f'module_{n // 100}' / f'test_{n}.out'
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    store = _DirectoryStore(workdir)
+    return lambda: {p.resolve() for p in store.paths() if p.suffix == '.out'}
+
+
+CASES: Final[dict[str, Callable[[pathlib.Path, int], Callable[[], object]]]] = {
+    'eq': case_eq
+  , 'match': case_match
+  , 'match-multiline': case_match_multiline
+  , 'edit-text': case_edit_text
+  , 'report-full': case_report_full
+  , 'report-diff': case_report_diff
+  , 'yaml': case_yaml
+  , 'unused-scan': case_unused_scan
+  }
+
+
+def measure(case: str, size: int, repeat: int) -> float:
+    """Return the best time (in seconds) of the case w/ the given input size."""
+    with tempfile.TemporaryDirectory(prefix='pytest-matcher-benchmark-') as workdir:
+        fn = CASES[case](pathlib.Path(workdir), size)
+        return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated input sizes, e.g., `1K,1M,100M`')
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated cases to run')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measurements')
+    parser.add_argument('--save-baseline', metavar='FILE', type=pathlib.Path, help='save results to the file')
+    parser.add_argument('--baseline', metavar='FILE', type=pathlib.Path, help='compare results w/ the file')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed slowdown in percents')
+    args = parser.parse_args()
+
+    cases = args.cases.split(',')
+    if unknown := [case for case in cases if case not in CASES]:
+        parser.error(f'unknown cases: {", ".join(unknown)}')
+
+    baseline: dict[str, float] = (
+        json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline is not None else {}
+      )
+
+    results: dict[str, float] = {}
+    regressions = 0
+    for case in cases:
+        for size in map(parse_size, args.sizes.split(',')):
+            key = f'{case}/{format_size(size)}'
+            results[key] = elapsed = measure(case, size, args.repeat)
+            line = f'{key:>24}: {elapsed:10.4f}s'
+
+            if (previous := baseline.get(key)) is not None:
+                change = (elapsed / previous - 1) * 100
+                regressed = change > args.threshold
+                regressions += regressed
+                line += f' ({change:+.1f}%)' + (' REGRESSION' if regressed else '')
+
+            sys.stdout.write(line + '\n')
+
+    if args.save_baseline is not None:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+
+    if regressions:
+        sys.stdout.write(f'{regressions} case(s) slower than the baseline by more than {args.threshold}%\n')
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+#
+# SPDX-FileCopyrightText: 2017-now, See `CONTRIBUTORS.lst`
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+"""Run the matcher benchmark cases with ``pytest-benchmark``.
+
+Usage::
+
+    PM_BENCHMARK_SIZES=1K,1M pytest benchmarks/ [--benchmark-autosave] [--benchmark-compare-fail=mean:10%]
+
+The ``pytest-benchmark`` plugin provides saving and comparing runs with a baseline.
+"""
+
+from __future__ import annotations
+
+# Standard imports
+import os
+from typing import TYPE_CHECKING, Any
+
+# Third party packages
+import pytest
+
+# Project specific imports
+from benchmarks.matcher import CASES, DEFAULT_SIZES, parse_size
+
+if TYPE_CHECKING:
+    import pathlib
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('size', os.environ.get('PM_BENCHMARK_SIZES', DEFAULT_SIZES).split(','))
+@pytest.mark.parametrize('case', CASES)
+def matcher_test(benchmark: Any, tmp_path: pathlib.Path, case: str, size: str) -> None:  # NOQA: ANN401
+    """Measure the benchmark case w/ the given input size."""
+    benchmark(CASES[case](tmp_path, parse_size(size)))
@@ -0,0 +1,73 @@
+#
+# SPDX-FileCopyrightText: 2017-now, See `CONTRIBUTORS.lst`
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+"""Compare the pure Python and ``libyaml`` based YAML loaders on large documents.
+
+Usage::
+
+    python benchmarks/yaml_loaders.py [--items N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+# Standard imports
+import argparse
+import sys
+import timeit
+from typing import Any
+
+# Third party packages
+import yaml
+
+
+def make_document(items: int) -> str:
+    """Generate a YAML document w/ the given number of nested items."""
+    return yaml.safe_dump({
+        'kind': 'List'
+      , 'items': [
+            {
+                'name': f'item-{n}'
+              , 'index': n
+              , 'enabled': n % 2 == 0
+              , 'labels': {'app': 'benchmark', 'tier': f'tier-{n % 7}'}
+              , 'values': [n, n * 0.5, str(n)]
+              }
+            for n in range(items)
+          ]
+      })
+
+
+def measure(document: str, loader: type[Any], repeat: int) -> float:
+    """Return the best time (in seconds) to load the document."""
+    return min(timeit.repeat(lambda: yaml.load(document, Loader=loader), number=1, repeat=repeat))  # NOQA: S506
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=20000, help='number of items in the document')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measurements')
+    args = parser.parse_args()
+
+    document = make_document(args.items)
+    sys.stdout.write(f'Document size: {len(document) / 1024 / 1024:.1f}MB\n')
+
+    loaders: list[type[Any]] = [yaml.SafeLoader]
+    if yaml.__with_libyaml__:
+        loaders.append(yaml.CSafeLoader)
+    else:
+        sys.stdout.write('PyYAML has been built w/o `libyaml`, the C loader is unavailable\n')
+
+    baseline = None
+    for loader in loaders:
+        elapsed = measure(document, loader, args.repeat)
+        baseline = elapsed if baseline is None else baseline
+        sys.stdout.write(f'{loader.__name__:>12}: {elapsed:8.3f}s (x{baseline / elapsed:.1f})\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,46 +8,59 @@
 from __future__ import annotations
 
 # Standard imports
-import difflib
+import abc
+import bisect
+import collections
+import contextlib
 import enum
+import errno
 import functools
+import importlib.util
+import io
+import itertools
+import json
+import locale
 import os
 import pathlib
 import platform
 import re
-import shutil
+import reprlib
 import string
+import struct
 import sys
-import urllib.parse
+import tempfile
+import threading
+import time
 from dataclasses import InitVar, astuple, dataclass, field
-from typing import TYPE_CHECKING, Any, Final, TextIO, cast
+from typing import IO, TYPE_CHECKING, Any, ClassVar, Final, TextIO, cast, final
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    import hashlib
+    import mmap
+    import sqlite3
+    import types
+    from collections.abc import Callable, Generator, Hashable, Iterable, Iterator
 
 # Third party packages
 import pytest
-import yaml
 
-try:
-    from pygments import highlight
-    from pygments.formatters import TerminalFormatter
-    from pygments.lexers import DiffLexer
-
-    HAVE_PYGMENTS = True
+# NOTE The plugin gets imported by every `pytest` process (including `pytest-xdist`
+# workers), so modules needed only by some fixtures or mismatch reports (`yaml`,
+# `difflib`, `pygments`, `shutil`, `urllib.parse`) are imported where they're used.
+HAVE_PYGMENTS = importlib.util.find_spec('pygments') is not None
+if HAVE_PYGMENTS:
     # ATTENTION THIS IS THE UGLY IMPORT OF PYTEST IMPLEMENTATION DETAILS
     # BUT UNFORTUNATELY I SEE NO OTHER WAY (and I don't like copy-n-paste %-)
     from _pytest._io.terminalwriter import should_do_markup
 
-except ImportError:
-    HAVE_PYGMENTS = False
-
+else:
     def should_do_markup(_: TextIO) -> bool:                # type: ignore[misc]
         """Fallback stub used when the optional dependency cannot be imported."""
         return False
 
 
 PM_COLOR_OUTPUT = pytest.StashKey[bool]()
+PM_PATTERN_CACHE = pytest.StashKey['_PatternCache']()
 
 ON_STORE_KWARGS_INT: Final[set[str]] = {
     'drop_head'
@@ -58,8 +71,81 @@ ON_STORE_KWARGS_STR: Final[set[str]] = {
   }
 ON_STORE_KWARGS: Final[set[str]] = ON_STORE_KWARGS_INT | ON_STORE_KWARGS_STR
 
+# Fixtures that use pattern files and the corresponding filename extensions
+PATTERN_FIXTURES: Final[dict[str, str]] = {
+    'expected_out': '.out'
+  , 'expected_err': '.err'
+  , 'expected_yaml': '.yaml'
+  , 'expected_bytes': '.bin'
+  , 'expected_json': '.json'
+  }
+# Fixtures that use text pattern files
+TEXT_PATTERN_FIXTURES: Final[tuple[str, ...]] = ('expected_out', 'expected_err', 'expected_yaml', 'expected_json')
+
+PM_CHANGED_ONLY_CACHE_KEY: Final[str] = 'pytest-matcher/pattern-files'
+PM_DIGEST_INDEX_CACHE_DIR: Final[str] = 'pytest-matcher-digests'
+PM_PROFILE_WORKER_OUTPUT: Final[str] = 'pm_profile_timings'
+PM_STATS_WORKER_OUTPUT: Final[str] = 'pm_stats_records'
+PM_CHANGED_ONLY_WORKER_OUTPUT: Final[str] = 'pm_changed_only_selection'
+PM_SHARED_CACHE_DIR: Final[str] = 'pm_shared_cache_dir'
+
+# Suffixes of compressed pattern files and the corresponding `pm-compression` values
+COMPRESSED_SUFFIXES: Final[dict[str, str]] = {
+    '.gz': 'gz'
+  , '.xz': 'xz'
+  }
+
+# Directory (inside the patterns base dir) to store deduplicated pattern content
+OBJECTS_DIR: Final[str] = '.objects'
+
+# Steps of the output normalization accepted by the `normalize` marker and `pm-normalize` option
+NORMALIZE_STEPS: Final[tuple[str, ...]] = ('ansi', 'control', 'eol', 'tmp-paths', 'trailing-whitespace')
+# Placeholder used to mask temporary directory paths
+NORMALIZED_TMP_PATH: Final[str] = '<TMP>'
+
+_DIGEST_CHUNK_SIZE: Final[int] = 1024 * 1024
+_COMPARE_CHUNK_SIZE: Final[int] = 1024 * 1024
+_HEXDUMP_WIDTH: Final[int] = 16
+_HEXDUMP_CONTEXT_ROWS: Final[int] = 4
+_BYTES_PREVIEW_SIZE: Final[int] = 4096
+# Max number and total size of saved patterns waiting to be written at once
+_WRITE_BATCH_MAX_ITEMS: Final[int] = 256
+_WRITE_BATCH_MAX_SIZE: Final[int] = 64 * 1024 * 1024
+
+_MISSING: Final[object] = object()
+# NOTE A reusable no-op timer used when profiling is disabled.
+_NO_TIMER: Final[contextlib.nullcontext[None]] = contextlib.nullcontext()
+
+# Phases of the matcher operations measured by the `--pm-profile` option
+PROFILE_PHASES: Final[tuple[str, ...]] = ('read', 'compile', 'match', 'eq', 'report', 'highlight', 'write')
+_PROFILE_SLOWEST_COUNT: Final[int] = 10
+
+# Regular expressions engines accepted by the `pm-regex-engine` option
+REGEX_ENGINES: Final[tuple[str, ...]] = ('re', 'regex', 're2')
+# Max number of compiled regular expressions kept by the pattern cache
+_REGEX_CACHE_SIZE: Final[int] = 1024
+# Inline equivalents of the `re` module flags for engines that don't accept flags
+_INLINE_FLAGS: Final[dict[re.RegexFlag, str]] = {re.IGNORECASE: 'i', re.MULTILINE: 'm', re.DOTALL: 's'}
+
+# Pattern files which can be matched as regular expressions
+REGEX_PATTERN_SUFFIXES: Final[tuple[str, ...]] = ('.out', '.err')
+# Unbounded wildcards separated only by optional whitespace in a regex made from a pattern
+_ADJACENT_WILDCARDS_RE: Final[re.Pattern[str]] = re.compile(
+    r'(?<!\\)\.[*+]\??(?: |\\s[*+]?\??)*(?<!\\)\.[*+]'
+  )
+
 
 _EOL_RE: Final[re.Pattern] = re.compile('(\r?\n|\r)')
+# CSI, OSC, and two-character escape sequences
+_ANSI_ESCAPE_RE: Final[str] = r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])'
+# C0 control characters (except TAB and line separators) and DEL
+_CONTROL_CHARS: Final[dict[int, None]] = dict.fromkeys((*range(0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f))
+_NORMALIZE_REPLACEMENTS: Final[dict[str | None, str]] = {
+    'ansi': ''
+  , 'tmp': NORMALIZED_TMP_PATH
+  , 'ws': ''
+  , 'eol': '\n'
+  }
 
 if sys.version_info < (3, 11):
     _RE_NOFLAG: Final[re.RegexFlag] = cast('re.RegexFlag', 0)
@@ -72,6 +158,913 @@ class _MismatchStyle(enum.Enum):
     DIFF = enum.auto()
 
 
+def _pattern_to_regex(content: str, flags: re.RegexFlag) -> str:
+    if flags & re.MULTILINE:
+        return '.*' + '.*\n'.join(content.strip().splitlines()) + '.*'
+    return ' '.join(content.strip().splitlines())
+
+
+def _pattern_to_bytes_regex(content: str, flags: re.RegexFlag, encoding: str) -> bytes:
+    # NOTE Unlike the text mode, the output is not split into lines and joined back,
+    # so line separators in the output must be matched by the regex itself.
+    lines = content.strip().splitlines()
+    if flags & re.MULTILINE:
+        return ('.*' + '.*\n'.join(lines) + '.*').encode(encoding)
+    return r'(?:\r?\n| )'.join(lines).encode(encoding)
+
+
+def _check_encoding(encoding: str) -> None:
+    # NOTE A regex encoded to bytes must keep its syntax.
+    try:
+        compatible = string.printable.encode(encoding) == string.printable.encode('ascii')
+    except LookupError:
+        compatible = False
+
+    if not compatible:
+        msg = f'Encoding `{encoding}` is unknown or not ASCII-compatible'
+        raise pytest.UsageError(msg)
+
+
+@dataclass(frozen=True)
+class _RegexEngine:
+    """Regular expressions engine used to match the output against pattern files.
+
+    An engine is a module w/ the :py:mod:`re` compatible ``compile()`` and ``escape()``
+    functions and the ``error`` exception type, e.g., :py:mod:`re` itself, ``regex``,
+    or ``re2``.
+    """
+
+    module: types.ModuleType
+    # NOTE RE2 doesn't accept the `re` module flags, but it supports inline ones.
+    inline_flags: bool = False
+    # NOTE Engines w/ linear-time matching are not prone to catastrophic backtracking.
+    linear: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.module.__name__
+
+    @property
+    def error(self) -> type[Exception]:
+        return cast('type[Exception]', self.module.error)
+
+    def compile(self, regex: str | bytes, flags: re.RegexFlag = _RE_NOFLAG) -> re.Pattern:
+        if not self.inline_flags:
+            return cast('re.Pattern', self.module.compile(regex, flags))
+
+        if unsupported := [
+            f're.{flag.name}' for flag in re.RegexFlag if flags & flag and flag not in _INLINE_FLAGS
+          ]:
+            msg = f'The `{self.name}` regular expressions engine doesn\'t support {", ".join(unsupported)}'
+            raise pytest.UsageError(msg)
+
+        if inline := ''.join(letter for flag, letter in _INLINE_FLAGS.items() if flags & flag):
+            prefix = f'(?{inline})'
+            regex = prefix.encode('ascii') + regex if isinstance(regex, bytes) else prefix + regex
+        return cast('re.Pattern', self.module.compile(regex))
+
+    def escape(self, text: str) -> str:
+        # NOTE Keep spaces unescaped to make saved patterns readable.
+        return cast('str', self.module.escape(text)).replace('\\ ', ' ')
+
+
+_STDLIB_REGEX_ENGINE: Final[_RegexEngine] = _RegexEngine(re)
+
+
+def _get_regex_engine(config: pytest.Config) -> _RegexEngine:
+    name = config.getini('pm-regex-engine')
+    if name not in REGEX_ENGINES:
+        msg = (
+            f"'pm-regex-engine' option have an invalid value `{name}`. "
+            f'Valid values are: {", ".join(f"`{engine}`" for engine in REGEX_ENGINES)}.'
+          )
+        raise pytest.UsageError(msg)
+
+    if name == _STDLIB_REGEX_ENGINE.name:
+        return _STDLIB_REGEX_ENGINE
+
+    try:
+        module = importlib.import_module(name)
+    except ImportError as ex:
+        msg = f"'pm-regex-engine' option requires the `{name}` module, but it's not installed"
+        raise pytest.UsageError(msg) from ex
+
+    return _RegexEngine(module, inline_flags=name == 're2', linear=name == 're2')
+
+
+def _blake2b(data: bytes = b'', digest_size: int = 64) -> hashlib.blake2b:
+    # NOTE Importing `hashlib` is relatively slow (it loads OpenSSL),
+    # so it's imported only when a digest is really needed.
+    import hashlib  # NOQA: PLC0415
+
+    return hashlib.blake2b(data, digest_size=digest_size)
+
+
+def _file_digest(path: pathlib.Path) -> str:
+    digest = _blake2b()
+    with path.open('rb') as fd:
+        while chunk := fd.read(_DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _text_digest(text: str) -> str:
+    # NOTE Encode the text in chunks to avoid a copy of the whole (possibly huge) text.
+    digest = _blake2b()
+    for offset in range(0, len(text), _DIGEST_CHUNK_SIZE):
+        digest.update(text[offset : offset + _DIGEST_CHUNK_SIZE].encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def _translate_newlines(text: str) -> str:
+    # NOTE Translate newlines the same way `pathlib.Path.read_text()` does.
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _encode_text(text: str) -> bytes:
+    # NOTE Encode the text the same way `pathlib.Path.write_text()` does.
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode(locale.getpreferredencoding(False))  # NOQA: FBT003
+
+
+def _open_compressed(path: pathlib.Path, mode: str) -> IO[Any]:
+    match path.suffix:
+        case '.gz':
+            import gzip  # NOQA: PLC0415
+
+            return cast('IO[Any]', gzip.open(path, mode))
+        case '.xz':
+            import lzma  # NOQA: PLC0415
+
+            return lzma.open(path, mode)
+        case _:
+            return path.open(mode)
+
+
+def _compress(data: bytes, compression: str | None, level: int | None) -> bytes:
+    match compression:
+        case 'gz':
+            import gzip  # NOQA: PLC0415
+
+            # NOTE Zero `mtime` makes the result reproducible.
+            return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+        case 'xz':
+            import lzma  # NOQA: PLC0415
+
+            return lzma.compress(data, preset=level)
+        case _:
+            return data
+
+
+def _tmp_name(path: pathlib.Path) -> pathlib.Path:
+    # NOTE Unique per writer, cuz pattern files can be written concurrently.
+    return path.with_name(f'.{path.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+
+
+def _replace_file(path: pathlib.Path, data: bytes) -> None:
+    # NOTE Never write into an existing file, cuz it might be
+    # a hard link to a shared (deduplicated) pattern content.
+    tmp_path = _tmp_name(path)
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
+
+def _text_stream_equals(fd: IO[str], text: str) -> bool:
+    offset = 0
+    while chunk := fd.read(_COMPARE_CHUNK_SIZE):
+        if not text.startswith(chunk, offset):
+            return False
+        offset += len(chunk)
+    return offset == len(text)
+
+
+def _buffer_mismatch_offset(expected: memoryview, actual: memoryview) -> int | None:
+    # NOTE Compare zero-copy slices chunk by chunk and bisect the first mismatched one.
+    size = min(len(expected), len(actual))
+    for offset in range(0, size, _COMPARE_CHUNK_SIZE):
+        low, high = offset, min(offset + _COMPARE_CHUNK_SIZE, size)
+        if expected[low:high] == actual[low:high]:
+            continue
+        while high - low > 1:
+            middle = (low + high) // 2
+            if expected[low:middle] == actual[low:middle]:
+                low = middle
+            else:
+                high = middle
+        return low
+    return None if len(expected) == len(actual) else size
+
+
+def _hexdump(data: memoryview, start: int, end: int) -> list[str]:
+    return [
+        f'{offset:08x}  {row.hex(" "):<{_HEXDUMP_WIDTH * 3 - 1}}  |'
+        + ''.join(chr(byte) if 0x20 <= byte < 0x7f else '.' for byte in row)  # NOQA: PLR2004
+        + '|'
+        for offset in range(start, min(end, len(data)), _HEXDUMP_WIDTH)
+        if (row := data[offset : offset + _HEXDUMP_WIDTH])
+      ]
+
+
+@contextlib.contextmanager
+def _map_file(path: pathlib.Path) -> Iterator[bytes | mmap.mmap]:
+    import mmap  # NOQA: PLC0415
+
+    with path.open('rb') as fd:
+        # NOTE Empty files can't be mapped.
+        if os.fstat(fd.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+class _DirectoryStore:
+    """Pattern files stored in the patterns base directory.
+
+    A pattern file may be compressed w/ ``gzip`` or ``xz``. In this case it has
+    an additional ``.gz`` or ``.xz`` extension and gets decompressed transparently.
+
+    When the digest index directory is given, saving a text pattern also writes
+    a digest of its content (and the pattern file size, modification time, and
+    inode to detect stale entries) into the index, in a file named by the digest
+    of the pattern file path.
+
+    When deduplication is enabled, saved pattern content is stored once in the
+    ``.objects`` directory (named by the content digest), and pattern files
+    become hard links to it. Objects not linked by any pattern file are removed
+    by :meth:`prune_objects`.
+    """
+
+    def __init__(
+        self
+      , base_dir: pathlib.Path
+      , compression: str | None = None
+      , compression_level: int | None = None
+      , *
+      , digests_dir: pathlib.Path | None = None
+      , dedup: bool = False
+      ) -> None:
+        self.base_dir = base_dir
+        self._compression = compression
+        self._compression_level = compression_level
+        self._digests_dir = digests_dir
+        self._dedup = dedup
+
+    def available(self) -> bool:
+        return self.base_dir.exists()
+
+    def exists(self, path: pathlib.Path) -> bool:
+        return self._find(path) is not None
+
+    def open_text(self, path: pathlib.Path) -> IO[str]:
+        return _open_compressed(self._find(path) or path, 'rt')
+
+    def read_text(self, path: pathlib.Path) -> str:
+        with self.open_text(path) as fd:
+            return fd.read()
+
+    def read_bytes(self, path: pathlib.Path) -> bytes:
+        with _open_compressed(self._find(path) or path, 'rb') as fd:
+            return cast('bytes', fd.read())
+
+    @contextlib.contextmanager
+    def map_bytes(self, path: pathlib.Path) -> Iterator[bytes | mmap.mmap]:
+        actual_path = self._find(path) or path
+        if actual_path.suffix in COMPRESSED_SUFFIXES:
+            yield self.read_bytes(path)
+            return
+
+        with _map_file(actual_path) as mapped:
+            yield mapped
+
+    def write_text(self, path: pathlib.Path, text: str) -> None:
+        target, changed = self._write(path, _encode_text(text))
+
+        if self._digests_dir is not None and (changed or self.digest(path) is None):
+            stat = target.stat()
+            _replace_file(
+                self._digest_entry(path)
+              , json.dumps({
+                    'size': stat.st_size
+                  , 'mtime_ns': stat.st_mtime_ns
+                  , 'ino': stat.st_ino
+                  , 'blake2b': _text_digest(_translate_newlines(text))
+                  }).encode()
+              )
+
+    def write_bytes(self, path: pathlib.Path, data: bytes) -> None:
+        self._write(path, data)
+
+    def write_batch(self, items: Iterable[tuple[pathlib.Path, str | bytes]]) -> None:
+        from concurrent.futures import ThreadPoolExecutor  # NOQA: PLC0415
+
+        # NOTE Writing files is I/O bound, so threads are good enough here.
+        with ThreadPoolExecutor() as executor:
+            for _ in executor.map(lambda item: _write_item(self, *item), items):
+                pass
+
+    def file_stat(self, path: pathlib.Path) -> tuple[int, int] | None:
+        actual_path = self._find(path)
+        if actual_path is None:
+            return None
+        stat = actual_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def identity(self, path: pathlib.Path) -> tuple[int, int] | None:
+        actual_path = self._find(path)
+        if actual_path is None:
+            return None
+        stat = actual_path.stat()
+        return stat.st_dev, stat.st_ino
+
+    def digest(self, path: pathlib.Path) -> str | None:
+        if self._digests_dir is None:
+            return None
+
+        actual_path = self._find(path)
+        try:
+            entry = json.loads(self._digest_entry(path).read_text())
+            if actual_path is None:
+                return None
+            # NOTE The pattern file might be edited after the entry was written
+            # (even w/ the same size), or replaced, e.g., by a VCS checkout.
+            stat = actual_path.stat()
+            if [stat.st_size, stat.st_mtime_ns, stat.st_ino] != [entry['size'], entry['mtime_ns'], entry['ino']]:
+                return None
+            return cast('str', entry['blake2b'])
+
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def paths(self) -> Iterable[pathlib.Path]:
+        return (
+            p.with_suffix('') if p.suffix in COMPRESSED_SUFFIXES else p
+            for p in self.base_dir.rglob('*')
+            if p.is_file()
+              and OBJECTS_DIR not in p.relative_to(self.base_dir).parts
+          )
+
+    def prune_objects(self) -> None:
+        objects_dir = self.base_dir / OBJECTS_DIR
+        # NOTE Sort to visit objects before their (then maybe empty) directories.
+        for p in sorted(objects_dir.rglob('*'), reverse=True):
+            with contextlib.suppress(OSError):
+                if p.is_dir():
+                    p.rmdir()
+                # NOTE An object w/ a single link isn't used by any pattern file anymore.
+                elif p.stat().st_nlink == 1:
+                    p.unlink()
+
+    def state(self, path: pathlib.Path, recorded: list[Any] | None) -> list[Any] | None:
+        actual_path = self._find(path)
+        if actual_path is None:
+            return None
+
+        stat = actual_path.stat()
+        # Avoid hashing a file that seems unchanged since the previous run
+        if recorded is not None and recorded[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return recorded
+
+        return [stat.st_mtime_ns, stat.st_size, _file_digest(actual_path)]
+
+    # BEGIN Private members
+    @staticmethod
+    def _variants(path: pathlib.Path) -> Iterable[pathlib.Path]:
+        yield path
+        for suffix in COMPRESSED_SUFFIXES:
+            yield path.with_suffix(path.suffix + suffix)
+
+    def _find(self, path: pathlib.Path) -> pathlib.Path | None:
+        return next((p for p in self._variants(path) if p.is_file()), None)
+
+    def _digest_entry(self, path: pathlib.Path) -> pathlib.Path:
+        assert self._digests_dir is not None
+        return self._digests_dir / _blake2b(path.as_posix().encode(), digest_size=16).hexdigest()
+
+    def _write(self, path: pathlib.Path, data: bytes) -> tuple[pathlib.Path, bool]:
+        target = path if self._compression is None else path.with_suffix(f'{path.suffix}.{self._compression}')
+        data = _compress(data, self._compression, self._compression_level)
+        # Leave the pattern file untouched if its content is the same
+        if self._is_unchanged(path, target, data):
+            return target, False
+
+        # Make a directory to store a pattern file if it doesn't exist yet
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Remove other variants of the pattern file, so they don't shadow the new one
+        for variant in self._variants(path):
+            if variant != target:
+                variant.unlink(missing_ok=True)
+
+        if self._dedup:
+            self._link_object(target, data)
+        else:
+            _replace_file(target, data)
+        return target, True
+
+    def _is_unchanged(self, path: pathlib.Path, target: pathlib.Path, data: bytes) -> bool:
+        # NOTE Check the size first to avoid hashing files that differ anyway.
+        return (
+            self._find(path) == target
+            and target.stat().st_size == len(data)
+            and _file_digest(target) == _blake2b(data).hexdigest()
+          )
+
+    def _link_object(self, target: pathlib.Path, data: bytes) -> None:
+        digest = _blake2b(data).hexdigest()
+        obj = self.base_dir / OBJECTS_DIR / digest[:2] / digest[2:]
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            # NOTE Never replace an existing object, cuz pattern files might be
+            # already linked to it by a concurrent writer of the same content.
+            tmp_obj = _tmp_name(obj)
+            tmp_obj.write_bytes(data)
+            try:
+                os.link(tmp_obj, obj)
+            except FileExistsError:
+                pass
+            except OSError:
+                # NOTE The filesystem doesn't support hard links, so just write the file.
+                _replace_file(target, data)
+                return
+            finally:
+                tmp_obj.unlink(missing_ok=True)
+
+        tmp_link = _tmp_name(target)
+        tmp_link.unlink(missing_ok=True)
+        try:
+            os.link(obj, tmp_link)
+        except OSError:
+            # NOTE The filesystem doesn't support hard links, so just write the file.
+            _replace_file(target, data)
+        else:
+            tmp_link.replace(target)
+    # END Private members
+
+
+class _ArchiveStore:
+    """Pattern files stored in a single SQLite database.
+
+    Pattern files are keyed by their paths relative to the patterns base directory
+    and loaded lazily one by one.
+    """
+
+    _SCHEMA: Final[str] = """
+        CREATE TABLE IF NOT EXISTS patterns (
+            key TEXT PRIMARY KEY
+          , content BLOB NOT NULL
+          , mtime_ns INTEGER NOT NULL
+          , digest TEXT NOT NULL
+          ) WITHOUT ROWID
+        """
+
+    def __init__(self, archive: pathlib.Path, base_dir: pathlib.Path) -> None:
+        self.archive = archive
+        self.base_dir = base_dir
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return True
+
+    def exists(self, path: pathlib.Path) -> bool:
+        return self._fetch('SELECT 1 FROM patterns WHERE key = ?', self._key(path)) is not None
+
+    def read_bytes(self, path: pathlib.Path) -> bytes:
+        row = self._fetch('SELECT content FROM patterns WHERE key = ?', self._key(path))
+        if row is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), str(path))
+        return bytes(row[0])
+
+    @contextlib.contextmanager
+    def map_bytes(self, path: pathlib.Path) -> Iterator[bytes | mmap.mmap]:
+        yield self.read_bytes(path)
+
+    def open_text(self, path: pathlib.Path) -> IO[str]:
+        return io.StringIO(self.read_text(path))
+
+    def read_text(self, path: pathlib.Path) -> str:
+        return _translate_newlines(self.read_bytes(path).decode('utf-8'))
+
+    def write_text(self, path: pathlib.Path, text: str) -> None:
+        self.write_bytes(path, text.encode('utf-8'))
+
+    def write_bytes(self, path: pathlib.Path, data: bytes) -> None:
+        self.write_batch([(path, data)])
+
+    def write_batch(self, items: Iterable[tuple[pathlib.Path, str | bytes]]) -> None:
+        db = self._connect(create=True)
+        assert db is not None
+        # NOTE Write all items in a single transaction.
+        with self._lock, db:
+            for path, payload in items:
+                data = payload.encode('utf-8') if isinstance(payload, str) else payload
+                key = self._key(path)
+                digest = _blake2b(data).hexdigest()
+                # Leave the pattern untouched if its content is the same
+                row = db.execute('SELECT digest FROM patterns WHERE key = ?', (key,)).fetchone()
+                if row is None or row[0] != digest:
+                    db.execute(
+                        'INSERT OR REPLACE INTO patterns (key, content, mtime_ns, digest) VALUES (?, ?, ?, ?)'
+                      , (key, data, time.time_ns(), digest)
+                      )
+
+    def digest(self, path: pathlib.Path) -> str | None:  # NOQA: ARG002
+        # NOTE The digest index is not supported by the archive.
+        return None
+
+    def file_stat(self, path: pathlib.Path) -> tuple[int, int] | None:
+        row = self._fetch('SELECT mtime_ns, length(content) FROM patterns WHERE key = ?', self._key(path))
+        return None if row is None else (row[0], row[1])
+
+    def identity(self, path: pathlib.Path) -> str | None:
+        row = self._fetch('SELECT digest FROM patterns WHERE key = ?', self._key(path))
+        return None if row is None else cast('str', row[0])
+
+    def paths(self) -> Iterable[pathlib.Path]:
+        db = self._connect()
+        if db is None:
+            return []
+        with self._lock:
+            return [self.base_dir / key for (key,) in db.execute('SELECT key FROM patterns ORDER BY key')]
+
+    def state(self, path: pathlib.Path, recorded: list[Any] | None) -> list[Any] | None:  # NOQA: ARG002
+        row = self._fetch('SELECT mtime_ns, length(content), digest FROM patterns WHERE key = ?', self._key(path))
+        return None if row is None else list(row)
+
+    def import_directory(self) -> int:
+        directory = _DirectoryStore(self.base_dir)
+        files = [p for p in directory.paths() if p.resolve() != self.archive.resolve()]
+        # NOTE Import all files in a single transaction.
+        self.write_batch((path, directory.read_bytes(path)) for path in files)
+        return len(files)
+
+    def export_directory(self) -> int:
+        paths = list(self.paths())
+        _DirectoryStore(self.base_dir).write_batch((path, self.read_bytes(path)) for path in paths)
+        return len(paths)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # BEGIN Private members
+    def _key(self, path: pathlib.Path) -> str:
+        return path.relative_to(self.base_dir).as_posix()
+
+    def _connect(self, *, create: bool = False) -> sqlite3.Connection | None:
+        if self._db is None:
+            if not (create or self.archive.exists()):
+                return None
+
+            import sqlite3  # NOQA: PLC0415
+
+            self.archive.parent.mkdir(parents=True, exist_ok=True)
+            # NOTE The connection is shared w/ the prewarming threads,
+            # so access to it is serialized w/ the lock.
+            self._db = sqlite3.connect(self.archive, timeout=60, check_same_thread=False)
+            with self._lock, self._db:
+                self._db.execute(self._SCHEMA)
+        return self._db
+
+    def _fetch(self, query: str, key: str) -> tuple[Any, ...] | None:
+        db = self._connect()
+        if db is None:
+            return None
+        with self._lock:
+            return cast('tuple[Any, ...] | None', db.execute(query, (key,)).fetchone())
+    # END Private members
+
+
+_PatternStore = _DirectoryStore | _ArchiveStore
+
+
+def _write_item(store: _PatternStore, path: pathlib.Path, payload: str | bytes) -> None:
+    if isinstance(payload, str):
+        store.write_text(path, payload)
+    else:
+        store.write_bytes(path, payload)
+
+
+class _SharedPatterns:
+    """Memory-mapped snapshot of pattern files shared by ``pytest-xdist`` workers.
+
+    The first worker that finishes the collection writes pattern files content
+    of all collected tests into a single snapshot file. Other workers map it read-only.
+
+    The snapshot file layout is the following: content of all pattern files, then
+    the JSON index (mapping a pattern file path to offset and size of its content),
+    and finally the 8-byte size of the index.
+    """
+
+    _SNAPSHOT_FILENAME: Final[str] = 'patterns.snapshot'
+    _LOCK_FILENAME: Final[str] = 'patterns.lock'
+    _INDEX_SIZE: Final[struct.Struct] = struct.Struct('<Q')
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self._directory = directory
+        self._mmap: mmap.mmap | None = None
+        self._index: dict[str, list[int]] = {}
+
+    def get(self, path: pathlib.Path) -> str | None:
+        if self._mmap is None and not self._attach():
+            return None
+
+        assert self._mmap is not None
+        if (entry := self._index.get(str(path))) is None:
+            return None
+
+        offset, size = entry
+        with memoryview(self._mmap) as view:
+            return str(view[offset:offset + size], 'utf-8')
+
+    def publish(self, store: _PatternStore, paths: Iterable[pathlib.Path]) -> None:
+        # Only the first worker writes the snapshot
+        try:
+            os.close(os.open(self._directory / self._LOCK_FILENAME, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return
+
+        index: dict[str, list[int]] = {}
+        offset = 0
+        snapshot = self._directory / self._SNAPSHOT_FILENAME
+        tmp_snapshot = snapshot.with_suffix('.tmp')
+        with tmp_snapshot.open('wb') as fd:
+            for path in paths:
+                try:
+                    # NOTE Store the decoded text (w/ newlines translated)
+                    # to get exactly the same content as `read_text()` does.
+                    data = store.read_text(path).encode('utf-8')
+                except (OSError, UnicodeError):
+                    continue
+                fd.write(data)
+                index[str(path)] = [offset, len(data)]
+                offset += len(data)
+
+            index_data = json.dumps(index).encode('utf-8')
+            fd.write(index_data)
+            fd.write(self._INDEX_SIZE.pack(len(index_data)))
+
+        # Make the snapshot visible to other workers atomically
+        tmp_snapshot.replace(snapshot)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # BEGIN Private members
+    def _attach(self) -> bool:
+        import mmap  # NOQA: PLC0415
+
+        try:
+            with (self._directory / self._SNAPSHOT_FILENAME).open('rb') as fd:
+                self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return False
+
+        index_end = len(self._mmap) - self._INDEX_SIZE.size
+        (index_size,) = self._INDEX_SIZE.unpack_from(self._mmap, index_end)
+        self._index = json.loads(self._mmap[index_end - index_size : index_end])
+        return True
+    # END Private members
+
+
+def _read_only(*_args: object, **_kwargs: object) -> Any:  # NOQA: ANN401
+    msg = 'The expected document is read-only'
+    raise TypeError(msg)
+
+
+class _FrozenDict(dict[Any, Any]):
+    """Read-only dictionary of a cached expected document."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+
+class _FrozenList(list[Any]):
+    """Read-only list of a cached expected document."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+
+def _freeze(document: object, memo: dict[int, object]) -> object:
+    # NOTE YAML aliases make shared (and even recursive) nodes,
+    # so freeze every node once.
+    if (frozen := memo.get(id(document), _MISSING)) is not _MISSING:
+        return frozen
+
+    match document:
+        case dict():
+            memo[id(document)] = frozen = _FrozenDict()
+            dict.update(
+                frozen
+              , ((_freeze(key, memo), _freeze(value, memo)) for key, value in document.items())
+              )
+        case list():
+            memo[id(document)] = frozen = _FrozenList()
+            list.extend(frozen, (_freeze(item, memo) for item in document))
+        case set():
+            frozen = frozenset(_freeze(item, memo) for item in document)
+        case _:
+            frozen = document
+    memo[id(document)] = frozen
+    return frozen
+
+
+def _freeze_documents(documents: list[object]) -> tuple[list[object], int]:
+    """Freeze parsed documents and estimate the memory they take (in bytes)."""
+    memo: dict[int, object] = {}
+    frozen = cast('list[object]', _freeze(documents, memo))
+    return frozen, sum(map(sys.getsizeof, memo.values()))
+
+
+class _ParsedDocuments:
+    """LRU cache of parsed expected documents.
+
+    Documents are keyed by the pattern file path and become stale when its
+    modification time or size changes. The cache size is the estimated
+    memory taken by parsed documents.
+    """
+
+    def __init__(self, max_size: int = 0) -> None:
+        self._max_size = max_size
+        self._size = 0
+        self._entries: collections.OrderedDict[
+            pathlib.Path
+          , tuple[tuple[int, int], int, list[object]]
+          ] = collections.OrderedDict()
+
+    def get(self, path: pathlib.Path, version: tuple[int, int]) -> list[object] | None:
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(path)
+        return entry[2]
+
+    def fits(self, size: int) -> bool:
+        return self._max_size > 0 and size <= self._max_size
+
+    def put(self, path: pathlib.Path, version: tuple[int, int], size: int, documents: list[object]) -> None:
+        self.discard(path)
+        if not self.fits(size):
+            return
+
+        self._entries[path] = (version, size, documents)
+        self._size += size
+        while self._size > self._max_size:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def discard(self, path: pathlib.Path) -> None:
+        if (entry := self._entries.pop(path, None)) is not None:
+            self._size -= entry[1]
+
+
+@dataclass
+class _PatternCache:
+    """In-memory cache of pattern files content and compiled regular expressions.
+
+    The cache is populated by the :option:`--pm-prewarm` option before tests run
+    and consumed by fixtures. When running under ``pytest-xdist`` w/ the
+    :option:`--pm-xdist-shared-cache` option, the content missed in the cache
+    is looked up in the snapshot shared between workers.
+    """
+
+    store: _PatternStore
+    contents: dict[pathlib.Path, str] = field(default_factory=dict)
+    # NOTE LRU of compiled regular expressions keyed by the engine name, the regex, and flags.
+    regexes: collections.OrderedDict[tuple[str, str | bytes, re.RegexFlag], re.Pattern] = field(
+        default_factory=collections.OrderedDict
+      )
+    shared: _SharedPatterns | None = None
+    documents: _ParsedDocuments = field(default_factory=_ParsedDocuments)
+    # NOTE When saving patterns, write them in batches (and the rest at the session end).
+    batch_writes: bool = False
+    profiler: _Profiler | None = None
+    engine: _RegexEngine = _STDLIB_REGEX_ENGINE
+    # NOTE Pattern files w/ the same content (or hard links to the same file)
+    # share a single in-memory copy.
+    _by_identity: dict[Hashable, str] = field(default_factory=dict, init=False, repr=False)
+    _by_content: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _pending: dict[pathlib.Path, str | bytes] = field(default_factory=dict, init=False, repr=False)
+    _pending_size: int = field(default=0, init=False, repr=False)
+    # NOTE Regexes are compiled concurrently by the prewarmer.
+    _regexes_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def get(self, path: pathlib.Path) -> str | None:
+        content = self.contents.get(path)
+        if content is None and self.shared is not None:
+            content = self.shared.get(path)
+        return content
+
+    def read_text(self, path: pathlib.Path) -> str:
+        content = self.get(path)
+        return self.store.read_text(path) if content is None else content
+
+    def write_text(self, path: pathlib.Path, text: str) -> None:
+        self._write(path, text)
+
+    def write_bytes(self, path: pathlib.Path, data: bytes) -> None:
+        self._write(path, data)
+
+    def flush(self) -> None:
+        pending, self._pending, self._pending_size = self._pending, {}, 0
+        if pending:
+            with self.timed('write', None):
+                self.store.write_batch(pending.items())
+
+    def timed(self, phase: str, path: pathlib.Path | None) -> contextlib.AbstractContextManager[object]:
+        return _NO_TIMER if self.profiler is None else _ProfileTimer(self.profiler, phase, path)
+
+    def comparison(self, mode: str, path: pathlib.Path, output: object) -> _Comparison:
+        return _Comparison(self, mode, path, output)
+
+    def iter_documents(
+        self
+      , path: pathlib.Path
+      , load_all: Callable[[str | IO[str]], Iterable[object]]
+      ) -> Generator[object, None, None]:
+        stat = self.store.file_stat(path)
+        documents = None if stat is None else self.documents.get(path, stat)
+
+        # NOTE Parsed documents take more memory than their source,
+        # so don't parse ones w/ the source bigger than the whole cache.
+        if documents is None and stat is not None and self.documents.fits(stat[1]):
+            documents, size = _freeze_documents(list(load_all(self.read_text(path))))
+            self.documents.put(path, stat, size, documents)
+
+        if documents is not None:
+            yield from documents
+            return
+
+        # NOTE Too big to be cached, so load documents one by one.
+        with self.store.open_text(path) as fd:
+            yield from load_all(fd)
+
+    def compile(self, content: str, flags: re.RegexFlag) -> re.Pattern:
+        return self._compile(_pattern_to_regex(content, flags), flags)
+
+    def compile_bytes(self, content: str, flags: re.RegexFlag, encoding: str) -> re.Pattern:
+        return self._compile(
+            _pattern_to_bytes_regex(content, flags, encoding)
+          , flags if flags & re.MULTILINE else flags | re.DOTALL
+          )
+
+    def prewarm(self, path: pathlib.Path, *, compile_regex: bool) -> None:
+        try:
+            identity = self.store.identity(path)
+            content = self._by_identity.get(identity) if identity is not None else None
+            if content is None:
+                content = self._by_content.setdefault(text := self.read_text(path), text)
+        except (OSError, UnicodeDecodeError):
+            # NOTE Let the test itself report the problem.
+            return
+
+        if identity is not None:
+            self._by_identity[identity] = content
+        self.contents[path] = content
+        if compile_regex and path.suffix in REGEX_PATTERN_SUFFIXES:
+            with contextlib.suppress(self.engine.error):
+                self.compile(content, _RE_NOFLAG)
+
+    # BEGIN Private members
+    def _compile(self, regex: str | bytes, flags: re.RegexFlag) -> re.Pattern:
+        # NOTE Unlike `re`, some engines (e.g., RE2) don't cache compiled regexes.
+        key = (self.engine.name, regex, flags)
+        with self._regexes_lock:
+            compiled = self.regexes.get(key)
+            if compiled is not None:
+                self.regexes.move_to_end(key)
+                return compiled
+
+        compiled = self.engine.compile(regex, flags)
+        with self._regexes_lock:
+            self.regexes[key] = compiled
+            while len(self.regexes) > _REGEX_CACHE_SIZE:
+                self.regexes.popitem(last=False)
+        return compiled
+
+    def _write(self, path: pathlib.Path, payload: str | bytes) -> None:
+        if self.batch_writes:
+            if (previous := self._pending.pop(path, None)) is not None:
+                self._pending_size -= len(previous)
+            self._pending[path] = payload
+            self._pending_size += len(payload)
+            # NOTE Don't keep too much in memory (or lose too much on a crash).
+            if len(self._pending) >= _WRITE_BATCH_MAX_ITEMS or self._pending_size >= _WRITE_BATCH_MAX_SIZE:
+                self.flush()
+        else:
+            with self.timed('write', path):
+                _write_item(self.store, path, payload)
+        self.contents.pop(path, None)
+        self.documents.discard(path)
+    # END Private members
+
+
 @dataclass
 class _ContentMatchResult:                                  # NOQA: PLW1641
     """Result of matching text content against a regular expression."""
@@ -101,12 +1094,84 @@ class _ContentMatchResult:                                  # NOQA: PLW1641
           ]
 
 
+@dataclass(frozen=True)
+class _Normalizer:
+    regex: re.Pattern[str] | None
+    table: dict[int, None]
+
+    def __call__(self, text: str) -> str:
+        # NOTE All multi-character replacements are done by a single regex,
+        # and deleting single characters by a `str.translate()` call.
+        if self.regex is not None:
+            text = self.regex.sub(self._replace, text)
+        return text.translate(self.table) if self.table else text
+
+    @staticmethod
+    def _replace(match: re.Match[str]) -> str:
+        return _NORMALIZE_REPLACEMENTS[match.lastgroup]
+
+
+def _tmp_paths() -> list[str]:
+    tmpdir = tempfile.gettempdir()
+    # NOTE Longer paths go first, so a prefix doesn't win.
+    return sorted({tmpdir, os.path.realpath(tmpdir)}, key=len, reverse=True)
+
+
+@functools.cache
+def _make_normalizer(steps: frozenset[str]) -> _Normalizer | None:
+    if not steps:
+        return None
+
+    alternatives = []
+    if 'ansi' in steps:
+        alternatives.append(f'(?P<ansi>{_ANSI_ESCAPE_RE})')
+    if 'tmp-paths' in steps:
+        # NOTE Also mask numbered base directories made by `pytest` for the `tmp_path` fixture.
+        alternatives.append(
+            '(?P<tmp>(?:' + '|'.join(map(re.escape, _tmp_paths())) + ')'
+            r'(?:[/\\]pytest-of-[^/\\\s]+[/\\]pytest-(?:[0-9]+|current))?)(?![\w.-])'
+          )
+    if 'trailing-whitespace' in steps:
+        # NOTE Whitespace followed by escape sequences or control characters
+        # is trailing too, if they're going to be removed.
+        removed = [
+            *([_ANSI_ESCAPE_RE] if 'ansi' in steps else [])
+          , *([r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]'] if 'control' in steps else [])
+          ]
+        skipped = f'(?:{"|".join(removed)})*' if removed else ''
+        alternatives.append(rf'(?P<ws>[ \t]+(?={skipped}(?:[\r\n]|\Z)))')
+    if 'eol' in steps:
+        alternatives.append(r'(?P<eol>\r\n?)')
+
+    return _Normalizer(
+        regex=re.compile('|'.join(alternatives)) if alternatives else None
+      , table=_CONTROL_CHARS if 'control' in steps else {}
+      )
+
+
+def _check_normalize_steps(steps: Iterable[str], source: str) -> frozenset[str]:
+    if unsupported := [f"'{step}'" for step in steps if step not in NORMALIZE_STEPS]:
+        plural = 's' if len(unsupported) > 1 else ''
+        valid = ', '.join(f'`{step}`' for step in NORMALIZE_STEPS)
+        msg = f'{source} got invalid normalization step{plural}: {", ".join(unsupported)}. Valid steps are: {valid}.'
+        raise pytest.UsageError(msg)
+    return frozenset(steps)
+
+
+def _get_normalizer(request: pytest.FixtureRequest) -> _Normalizer | None:
+    marker = request.node.get_closest_marker('normalize')
+    if marker is not None:
+        return _make_normalizer(_check_normalize_steps(marker.args, "'normalize' marker"))
+    return _make_normalizer(frozenset(request.config.getini('pm-normalize')))
+
+
 @dataclass
 class _ContentEditParameters:
     replace_matched_lines_raw: InitVar[list[str] | None] = None
     replace_matched_lines: list[re.Pattern] = field(default_factory=list, init=False)
     drop_head: int = 0
     drop_tail: int = 0
+    engine: _RegexEngine = _STDLIB_REGEX_ENGINE
 
     def __post_init__(self, replace_matched_lines_raw: list[str] | None) -> None:
         self.replace_matched_lines = functools.reduce(
@@ -119,8 +1184,8 @@ class _ContentEditParameters:
 
     def _str2re(self, state: list[re.Pattern], raw_re: str) -> list[re.Pattern]:
         try:
-            return [*state, re.compile(raw_re)]
-        except re.error as ex:
+            return [*state, self.engine.compile(raw_re)]
+        except self.engine.error as ex:
             msg = f"'on_store' marker got invalid regular expression: '{raw_re}'"
             raise pytest.UsageError(msg) from ex
 
@@ -132,15 +1197,15 @@ class _ContentEditParameters:
     def _edit_line(self, state: Iterable[str], line: str) -> Iterable[str]:
         if self.replace_matched_lines:
             re_line = functools.reduce(
-                lambda text, regex: re.sub(regex, regex.pattern, text)
+                lambda text, regex: regex.sub(regex.pattern, text)
               , self.replace_matched_lines
               , line
               )
             # Escape regex symbols if line doesn't match
-            line = self._regex_escape(line) if re_line == line else re_line
+            line = self.engine.escape(line) if re_line == line else re_line
 
         else:
-            line = self._regex_escape(line)
+            line = self.engine.escape(line)
 
         return [*state, line]
 
@@ -158,10 +1223,6 @@ class _ContentEditParameters:
     def is_edit_requested(self) -> bool:
         return bool(self.drop_head) or bool(self.drop_tail) or bool(self.replace_matched_lines)
 
-    @staticmethod
-    def _regex_escape(text: str) -> str:
-        return re.escape(text).replace('\\ ', ' ')
-
 
 @dataclass
 class _ContentCheckOrStorePattern:                          # NOQA: PLW1641
@@ -169,21 +1230,33 @@ class _ContentCheckOrStorePattern:                          # NOQA: PLW1641
     pattern_filename: pathlib.Path
     store: bool
     edit: _ContentEditParameters
+    cache: _PatternCache
+    encoding: str = 'utf-8'
+    normalize: _Normalizer | None = None
 
     @functools.cached_property
     def expected_file_content(self) -> str:
-        if not (self.pattern_filename.exists() and self.pattern_filename.is_file()):
+        if (content := self.cache.get(self.pattern_filename)) is not None:
+            return content
+
+        if not self.cache.store.exists(self.pattern_filename):
             pytest.skip(f'Pattern file not found `{self.pattern_filename}`')
 
-        return self.pattern_filename.read_text()
+        with self.cache.timed('read', self.pattern_filename):
+            return self.cache.store.read_text(self.pattern_filename)
 
     def __eq__(self, text: object) -> bool:
         if not isinstance(text, str):
             msg = 'An argument to `__eq__` must be `str` type'
             raise TypeError(msg)
 
-        self._maybe_store_pattern(text)
-        return self.expected_file_content == text
+        text = self._normalize(text)
+        with self.cache.comparison('eq', self.pattern_filename, text) as comparison:
+            self._maybe_store_pattern(text)
+
+            with self.cache.timed('eq', self.pattern_filename):
+                comparison.result = self._equals(text)
+            return comparison.result
 
     def __str__(self) -> str:
         return self.expected_file_content
@@ -191,27 +1264,48 @@ class _ContentCheckOrStorePattern:                          # NOQA: PLW1641
     def __repr__(self) -> str:
         return f"(pattern_filename='{self.pattern_filename!s}', pattern='{self.expected_file_content}')"
 
-    def match(self, text: str, flags: re.RegexFlag = _RE_NOFLAG) -> _ContentMatchResult:
+    def match(
+        self
+      , text: str | bytes | bytearray | memoryview | pathlib.Path
+      , flags: re.RegexFlag = _RE_NOFLAG
+      , *
+      , encoding: str | None = None
+      ) -> _ContentMatchResult:
+        with self.cache.comparison('regex', self.pattern_filename, text) as comparison:
+            result = (
+                self._match_text(text, flags)
+                if isinstance(text, str)
+                else self._match_bytes(text, flags, self.encoding if encoding is None else encoding)
+              )
+            comparison.result = result.result
+            return result
+
+    def report_compare_mismatch(self, actual: str, *, color: bool, style: _MismatchStyle) -> list[str]:
+        actual = self._normalize(actual)
+        return (
+            self._report_mismatch_diff(actual, color=color)
+            if style == _MismatchStyle.DIFF
+            else self._report_mismatch_text(actual, color=color)
+          )
+
+    # BEGIN Private members
+    def _match_text(self, text: str, flags: re.RegexFlag) -> _ContentMatchResult:
+        text = self._normalize(text)
         self._maybe_store_pattern(text)
-        content = (
-            '.*\n' if flags & re.MULTILINE else ' '
-          ).join(
-              self.expected_file_content.strip().splitlines()
-            )
+        content = self.expected_file_content
         try:
-            if flags & re.MULTILINE:
-                what = re.compile('.*' + content + '.*', flags=flags)
-            else:
-                what = re.compile(content, flags=flags)
+            with self.cache.timed('compile', self.pattern_filename):
+                what = self.cache.compile(content, flags)
 
-        except re.error as ex:
+        except self.cache.engine.error as ex:
             pytest.skip(
                 f'Compiling the regular expression from the pattern failed: {ex!s}'
               )
 
         text_lines = text.splitlines()
 
-        m = what.fullmatch(('\n' if flags & re.MULTILINE else ' ').join(text_lines))
+        with self.cache.timed('match', self.pattern_filename):
+            m = what.fullmatch(('\n' if flags & re.MULTILINE else ' ').join(text_lines))
         return _ContentMatchResult(
             result=m is not None and bool(m)
           , text=text_lines
@@ -219,25 +1313,28 @@ class _ContentCheckOrStorePattern:                          # NOQA: PLW1641
           , filename=self.pattern_filename
           )
 
-    def report_compare_mismatch(self, actual: str, *, color: bool, style: _MismatchStyle) -> list[str]:
-        return (
-            self._report_mismatch_diff(actual, color=color)
-            if style == _MismatchStyle.DIFF
-            else self._report_mismatch_text(actual, color=color)
-          )
+    def _equals(self, text: str) -> bool:
+        # NOTE Avoid reading the whole (possibly huge) pattern file
+        # into memory, unless it's already there.
+        if 'expected_file_content' not in self.__dict__ and self.cache.get(self.pattern_filename) is None:
+            # Compare digests w/o reading the pattern file at all if possible.
+            if (digest := self.cache.store.digest(self.pattern_filename)) is not None:
+                return digest == _text_digest(text)
+            return self._stream_equals(text)
+
+        return self.expected_file_content == text
+
+    def _normalize(self, text: str) -> str:
+        return text if self.normalize is None else self.normalize(text)
 
-    # BEGIN Private members
     def _maybe_store_pattern(self, text: str) -> None:
         if not self.store:
             return
 
-        # Make a directory to store a pattern file if it doesn't exist yet
-        if not self.pattern_filename.parent.exists():
-            self.pattern_filename.parent.mkdir(parents=True)
-
         # Store!
-        self.pattern_filename.write_text(
-            self.edit.edit_text(text)
+        self.cache.write_text(
+            self.pattern_filename
+          , self.edit.edit_text(text)
             if self.edit.is_edit_requested()
             else text
           )
@@ -245,45 +1342,109 @@ class _ContentCheckOrStorePattern:                          # NOQA: PLW1641
         # Also mark the test as skipped!
         pytest.skip(f'Pattern file saved to `{self.pattern_filename}`.')
 
+    def _match_bytes(
+        self
+      , output: bytes | bytearray | memoryview | pathlib.Path
+      , flags: re.RegexFlag
+      , encoding: str
+      ) -> _ContentMatchResult:
+        _check_encoding(encoding)
+
+        with (
+            _map_file(output) if isinstance(output, pathlib.Path) else contextlib.nullcontext(output) as data
+          , memoryview(data) as view
+          ):
+            if self.store:
+                self._maybe_store_pattern(_translate_newlines(str(view, encoding)))
+
+            content = self.expected_file_content
+            try:
+                with self.cache.timed('compile', self.pattern_filename):
+                    what = self.cache.compile_bytes(content, flags, encoding)
+
+            except (self.cache.engine.error, UnicodeEncodeError) as ex:
+                pytest.skip(
+                    f'Compiling the regular expression from the pattern failed: {ex!s}'
+                  )
+
+            # Ignore the trailing line separator the same way `str.splitlines()` does
+            end = len(view)
+            if view[end - 1 : end].tobytes() == b'\n':
+                end -= 1
+            if view[end - 1 : end].tobytes() == b'\r':
+                end -= 1
+
+            preview = str(view[:_BYTES_PREVIEW_SIZE], encoding, 'replace').splitlines()
+            if len(view) > _BYTES_PREVIEW_SIZE:
+                preview.append(f'... ({len(view)} bytes total)')
+
+            with self.cache.timed('match', self.pattern_filename):
+                result = what.fullmatch(data, 0, end) is not None
+
+            return _ContentMatchResult(
+                result=result
+              , text=preview
+              , regex=self.expected_file_content
+              , filename=self.pattern_filename
+              )
+
+    def _stream_equals(self, text: str) -> bool:
+        if not self.cache.store.exists(self.pattern_filename):
+            pytest.skip(f'Pattern file not found `{self.pattern_filename}`')
+
+        with self.cache.store.open_text(self.pattern_filename) as fd:
+            return _text_stream_equals(fd, text)
+
     def _make_newlines_visible(self, text: str) -> str:
         return _EOL_RE.sub(r'↵\1', text)
 
     def _report_mismatch_text(self, actual: str, *, color: bool) -> list[str]:  # NOQA: ARG002
-        return [
-            ''
-          , "The test output doesn't match the expected output."
-          , f'(from `{self.pattern_filename}`):'
-          , '---[BEGIN actual output]---'
-          , *self._make_newlines_visible(actual).splitlines()
-          , '---[END actual output]---'
-          , '---[BEGIN expected output]---'
-          , *self._make_newlines_visible(self.expected_file_content).splitlines()
-          , '---[END expected output]---'
-          ]
+        expected = self.expected_file_content
+        with self.cache.timed('report', self.pattern_filename):
+            return [
+                ''
+              , "The test output doesn't match the expected output."
+              , f'(from `{self.pattern_filename}`):'
+              , '---[BEGIN actual output]---'
+              , *self._make_newlines_visible(actual).splitlines()
+              , '---[END actual output]---'
+              , '---[BEGIN expected output]---'
+              , *self._make_newlines_visible(expected).splitlines()
+              , '---[END expected output]---'
+              ]
 
     def _report_mismatch_diff(self, actual: str, *, color: bool) -> list[str]:
-        diff=[
-            *difflib.unified_diff(
-                self._make_newlines_visible(self.expected_file_content).splitlines()
-              , self._make_newlines_visible(actual).splitlines()
-              , fromfile='expected'
-              , tofile='actual'
-              , lineterm=''
-              )
-          ]
+        import difflib  # NOQA: PLC0415
+
+        expected = self.expected_file_content
+        with self.cache.timed('report', self.pattern_filename):
+            diff=[
+                *difflib.unified_diff(
+                    self._make_newlines_visible(expected).splitlines()
+                  , self._make_newlines_visible(actual).splitlines()
+                  , fromfile='expected'
+                  , tofile='actual'
+                  , lineterm=''
+                  )
+              ]
 
         if HAVE_PYGMENTS and color:
-            colored_diff = highlight(
-                '\n'.join(diff)
-              , DiffLexer()
-              , TerminalFormatter(
-                    # NOTE Here we don't care about incorrect values
-                    # of envvars cuz `pytest` already made an instance
-                    # of `TerminalWriter` which handles this situation!
-                    bg=os.getenv('PYTEST_THEME_MODE', 'dark')
-                  , style=os.getenv('PYTEST_THEME')
+            from pygments import highlight  # NOQA: PLC0415
+            from pygments.formatters import TerminalFormatter  # NOQA: PLC0415
+            from pygments.lexers import DiffLexer  # NOQA: PLC0415
+
+            with self.cache.timed('highlight', self.pattern_filename):
+                colored_diff = highlight(
+                    '\n'.join(diff)
+                  , DiffLexer()
+                  , TerminalFormatter(
+                        # NOTE Here we don't care about incorrect values
+                        # of envvars cuz `pytest` already made an instance
+                        # of `TerminalWriter` which handles this situation!
+                        bg=os.getenv('PYTEST_THEME_MODE', 'dark')
+                      , style=os.getenv('PYTEST_THEME')
+                      )
                   )
-              )
             diff = colored_diff.splitlines()
 
         return [
@@ -315,13 +1476,30 @@ def _subst_pattern_parts(result: pathlib.Path, current: str, **kwargs: str) -> p
     return result / part if part else result
 
 
+def _make_shard(subst: dict[str, str]) -> str:
+    # NOTE Spread pattern files across 256 subdirectories. The shard depends on
+    # the same parts as the pattern filename, so moving a test module to another
+    # directory doesn't move its pattern files to other shards.
+    # Parts never contain a slash (it's escaped in the `callspec`).
+    key = '/'.join(subst[part] for part in ('module', 'class', 'fn', 'callspec', 'suffix'))
+    return _blake2b(key.encode('utf-8'), digest_size=1).hexdigest()
+
+
 def _make_expected_filename(request: pytest.FixtureRequest, ext: str) -> pathlib.Path:
     result = request.config.rootpath / _get_base_dir(request.config)
 
     # Make sure base directory exists
-    if not result.exists():
+    if not request.config.stash[PM_PATTERN_CACHE].store.available():
         pytest.skip(f'Base directory for pattern-matcher does not exist: `{result}`')
 
+    return _format_expected_filename(request, result, ext)
+
+
+def _format_expected_filename(
+    request: pytest.FixtureRequest
+  , base_dir: pathlib.Path
+  , ext: str
+  ) -> pathlib.Path:
     # Check if a test function has been marked as having a
     # suffix for a pattern filename.
     args: list[str] = []
@@ -337,6 +1515,8 @@ def _make_expected_filename(request: pytest.FixtureRequest, ext: str) -> pathlib
         if not args:
             args.append(platform.system())
 
+    import urllib.parse  # NOQA: PLC0415
+
     subst = {
         'module': request.module.__name__.split('.')[-1]
       , 'class': request.cls.__name__ if request.cls is not None else ''
@@ -347,15 +1527,32 @@ def _make_expected_filename(request: pytest.FixtureRequest, ext: str) -> pathlib
           )
       , 'suffix': ('','-')[int(bool(args))] + urllib.parse.quote('-'.join(args), safe='[]')
       }
+    subst['shard'] = _make_shard(subst)
 
     result = functools.reduce(
         functools.partial(_subst_pattern_parts, **subst)
       , pathlib.Path(request.config.getini('pm-pattern-file-fmt')).parts
-      , result
+      , base_dir
       )
     return result.with_suffix(result.suffix + ext)
 
 
+def _item_expected_files(
+    item: pytest.Item
+  , base_dir: pathlib.Path
+  , fixtures: Iterable[str] = PATTERN_FIXTURES
+  ) -> list[pathlib.Path]:
+    # NOTE Only test functions may request fixtures!
+    if not isinstance(item, pytest.Function):
+        return []
+
+    return [
+        _format_expected_filename(item._request, base_dir, PATTERN_FIXTURES[fixture])  # NOQA: SLF001
+        for fixture in fixtures
+        if fixture in item.fixturenames
+      ]
+
+
 @dataclass
 class _OnStoreParamsReducerState:
     ctor_args: dict[str, list[str] | int] = field(default_factory=dict)
@@ -388,9 +1585,10 @@ def _collect_on_store_param(
 
 
 def _try_get_on_store_params(request: pytest.FixtureRequest) -> _ContentEditParameters:
+    engine = request.config.stash[PM_PATTERN_CACHE].engine
     on_store = request.node.get_closest_marker('on_store')
     if on_store is None:
-        return _ContentEditParameters()
+        return _ContentEditParameters(engine=engine)
 
     ctor_args, unsupported, invalid_type = astuple(
         functools.reduce(
@@ -417,7 +1615,7 @@ def _try_get_on_store_params(request: pytest.FixtureRequest) -> _ContentEditPara
       , "'on_store' marker got invalid parameter{plural}: {items}"
       )
 
-    return _ContentEditParameters(**ctor_args)
+    return _ContentEditParameters(**ctor_args, engine=engine)
 
 
 @pytest.fixture
@@ -427,6 +1625,9 @@ def expected_out(request: pytest.FixtureRequest) -> _ContentCheckOrStorePattern:
         _make_expected_filename(request, '.out')
       , store=request.config.getoption('--pm-save-patterns')
       , edit=_try_get_on_store_params(request)
+      , cache=request.config.stash[PM_PATTERN_CACHE]
+      , encoding=request.config.getini('pm-bytes-encoding')
+      , normalize=_get_normalizer(request)
       )
 
 
@@ -437,68 +1638,400 @@ def expected_err(request: pytest.FixtureRequest) -> _ContentCheckOrStorePattern:
         _make_expected_filename(request, '.err')
       , store=request.config.getoption('--pm-save-patterns')
       , edit=_try_get_on_store_params(request)
+      , cache=request.config.stash[PM_PATTERN_CACHE]
+      , encoding=request.config.getini('pm-bytes-encoding')
+      , normalize=_get_normalizer(request)
       )
 
 
 @dataclass
-class _YAMLCheckOrStorePattern:                             # NOQA: PLW1641
+class _BytesCheckOrStorePattern:                            # NOQA: PLW1641
 
-    expected_file: pathlib.Path
+    pattern_filename: pathlib.Path
     store: bool
-    result: object | None = None
-    expected: object | None = None
+    cache: _PatternCache
 
-    def _store_pattern_file(self, result_file: pathlib.Path) -> None:
-        assert self.store, 'Code review required!'
+    def __eq__(self, data: object) -> bool:
+        if not isinstance(data, bytes | bytearray | memoryview):
+            msg = 'An argument to `__eq__` must be `bytes`, `bytearray` or `memoryview` type'
+            raise TypeError(msg)
 
-        if not self.expected_file.parent.exists():
-            self.expected_file.parent.mkdir(parents=True)
+        with self.cache.comparison('bytes', self.pattern_filename, data) as comparison:
+            self._maybe_store_pattern(data)
+
+            with (
+                self._map_pattern() as expected
+              , memoryview(data) as view
+              , view.cast('B') as actual
+              , self.cache.timed('eq', self.pattern_filename)
+              ):
+                comparison.result = _buffer_mismatch_offset(expected, actual) is None
+            return comparison.result
+
+    def report_compare_mismatch(self, data: bytes | bytearray | memoryview) -> list[str]:
+        with (
+            self._map_pattern() as expected
+          , memoryview(data) as view
+          , view.cast('B') as actual
+          , self.cache.timed('report', self.pattern_filename)
+          ):
+            offset = _buffer_mismatch_offset(expected, actual)
+            assert offset is not None
+
+            row_offset = offset - offset % _HEXDUMP_WIDTH
+            start = max(0, row_offset - _HEXDUMP_CONTEXT_ROWS * _HEXDUMP_WIDTH)
+            end = row_offset + (_HEXDUMP_CONTEXT_ROWS + 1) * _HEXDUMP_WIDTH
+            sizes = f'expected size {len(expected)}, actual size {len(actual)}'
+            return [
+                ''
+              , "The test output doesn't match the expected output."
+              , f'(from `{self.pattern_filename}`):'
+              , f'First difference at offset {offset} (0x{offset:x}), {sizes}.'
+              , '---[BEGIN actual output]---'
+              , *_hexdump(actual, start, end)
+              , '---[END actual output]---'
+              , '---[BEGIN expected output]---'
+              , *_hexdump(expected, start, end)
+              , '---[END expected output]---'
+              ]
 
-        assert self.expected_file.parent.is_dir()
+    # BEGIN Private members
+    def _maybe_store_pattern(self, data: bytes | bytearray | memoryview) -> None:
+        if not self.store:
+            return
 
-        shutil.copy(str(result_file), str(self.expected_file))
+        self.cache.write_bytes(self.pattern_filename, bytes(data))
+        pytest.skip(f'Pattern file saved to `{self.pattern_filename}`.')
 
-    def __eq__(self, result_file: object) -> bool:
-        assert isinstance(result_file, pathlib.Path)
+    @contextlib.contextmanager
+    def _map_pattern(self) -> Iterator[memoryview]:
+        if not self.cache.store.exists(self.pattern_filename):
+            pytest.skip(f'Pattern file not found `{self.pattern_filename}`')
 
-        if self.store:
-            self._store_pattern_file(result_file)
-            return True
+        # NOTE The view must be released before the file gets unmapped.
+        with self.cache.store.map_bytes(self.pattern_filename) as data, memoryview(data) as view:
+            yield view
+    # END Private members
 
-        if not result_file.exists():
-            pytest.skip(f'Result YAML file not found `{result_file}`')
 
-        if not self.expected_file.exists():
-            pytest.skip(f'Expected YAML file not found `{self.expected_file}`')
+@pytest.fixture
+def expected_bytes(request: pytest.FixtureRequest) -> _BytesCheckOrStorePattern:
+    """Pytest fixture for matching binary output against a file."""
+    return _BytesCheckOrStorePattern(
+        _make_expected_filename(request, '.bin')
+      , store=request.config.getoption('--pm-save-patterns')
+      , cache=request.config.stash[PM_PATTERN_CACHE]
+      )
+
 
-        # Load data to compare
-        with result_file.open('r') as result_fd, self.expected_file.open('r') as expected_fd:
-            self.result = yaml.safe_load(result_fd)
-            self.expected = yaml.safe_load(expected_fd)
+@dataclass
+class _StructuralDifference:
+    """A difference between the actual and expected documents."""
 
-            return bool(self.result == self.expected)
+    document: int
+    path: str
+    actual: object
+    expected: object
 
-    def report_compare_mismatch(self, actual: pathlib.Path) -> list[str]:
-        assert self.result is not None
-        assert self.expected is not None
+    def report(self) -> list[str]:
         return [
-            ''
-          , f'Comparing the test result (`{actual}`) with the expected YAML file (`{self.expected_file}`):'
-          , '---[BEGIN actual result]---'
-          , repr(self.result)
-          , '---[END actual result]---'
-          , '---[BEGIN expected result]---'
-          ,  repr(self.expected)
-          , '---[END expected result]---'
+            (f'document #{self.document + 1}: ' if self.document else '') + (self.path or '<root>')
+          , f'  - {_format_value(self.expected)}'
+          , f'  + {_format_value(self.actual)}'
           ]
 
 
+_VALUE_REPR: Final[reprlib.Repr] = reprlib.Repr()
+_VALUE_REPR.maxstring = _VALUE_REPR.maxother = 120
+_SIMPLE_KEY_RE: Final[re.Pattern] = re.compile(r'[^\s.\[\]]+')
+
+
+def _format_value(value: object) -> str:
+    return '<missing>' if value is _MISSING else _VALUE_REPR.repr(value)
+
+
+def _path_key(key: object) -> str:
+    return f'.{key}' if isinstance(key, str) and _SIMPLE_KEY_RE.fullmatch(key) else f'[{key!r}]'
+
+
+def _canonical(value: object) -> Hashable:
+    # NOTE Values equal as multisets get equal canonical forms, so they can
+    # be counted in a hash table instead of matching lists pairwise.
+    match value:
+        case dict():
+            return dict, frozenset((key, _canonical(item)) for key, item in value.items())
+        case list():
+            return list, frozenset(collections.Counter(_canonical(item) for item in value).items())
+        case set() | frozenset():
+            return set, frozenset(map(_canonical, value))
+        case _:
+            return value
+
+
+def _iter_multiset_differences(
+    path: str
+  , actual: list[object]
+  , expected: list[object]
+  ) -> Iterator[tuple[str, object, object]]:
+    actual_keys = [_canonical(item) for item in actual]
+    counts = collections.Counter(actual_keys)
+
+    for item in expected:
+        key = _canonical(item)
+        if counts[key] > 0:
+            counts[key] -= 1
+        else:
+            yield f'{path}[*]', _MISSING, item
+
+    # Report actual items left unmatched
+    for key, item in zip(actual_keys, actual, strict=True):
+        if counts[key] > 0:
+            counts[key] -= 1
+            yield f'{path}[*]', item, _MISSING
+
+
+def _iter_differences(
+    actual: object
+  , expected: object
+  , *
+  , unordered_lists: bool = False
+  ) -> Iterator[tuple[str, object, object]]:
+    # NOTE Walk both documents depth-first w/ an explicit stack (to not hit
+    # the recursion limit on deeply nested documents), and generate differences
+    # lazily, so the caller can stop at the first one.
+    stack: list[tuple[tuple[str, ...], object, object]] = [((), actual, expected)]
+    while stack:
+        path, actual, expected = stack.pop()
+        match actual, expected:
+            case list(), list() if unordered_lists:
+                yield from _iter_multiset_differences(''.join(path).removeprefix('.'), actual, expected)
+                continue
+            case dict(), dict():
+                children = [
+                    (
+                        (*path, _path_key(key))
+                      , actual.get(key, _MISSING)
+                      , expected.get(key, _MISSING)
+                      )
+                    for key in itertools.chain(expected, (key for key in actual if key not in expected))
+                  ]
+            case list(), list():
+                children = [
+                    ((*path, f'[{index}]'), actual_item, expected_item)
+                    for index, (actual_item, expected_item) in enumerate(
+                        itertools.zip_longest(actual, expected, fillvalue=_MISSING)
+                      )
+                  ]
+            case _:
+                if actual is _MISSING or expected is _MISSING or actual != expected:
+                    yield ''.join(path).removeprefix('.'), actual, expected
+                continue
+
+        stack.extend(reversed(children))
+
+
+def _iter_document_differences(
+    actual: Iterable[object]
+  , expected: Iterable[object]
+  , *
+  , unordered_lists: bool = False
+  ) -> Iterator[_StructuralDifference]:
+    for document, (actual_document, expected_document) in enumerate(
+        itertools.zip_longest(actual, expected, fillvalue=_MISSING)
+      ):
+        for path, actual_value, expected_value in _iter_differences(
+            actual_document
+          , expected_document
+          , unordered_lists=unordered_lists
+          ):
+            yield _StructuralDifference(document, path, actual_value, expected_value)
+
+
+@dataclass
+class _DocumentCheckOrStorePattern(abc.ABC):                # NOQA: PLW1641
+    """Base class of structured documents (YAML or JSON) checkers."""
+
+    expected_file: pathlib.Path
+    store: bool
+    cache: _PatternCache
+    max_differences: int = 10
+    unordered_lists: bool = False
+
+    _KIND: ClassVar[str]
+
+    def __eq__(self, result: object) -> bool:
+        with self.cache.comparison(self._KIND.lower(), self.expected_file, result) as comparison:
+            comparison.result = self._equals(result)
+            return comparison.result
+
+    def report_compare_mismatch(self, actual: object) -> list[str]:
+        # NOTE Compare documents again (only when the assertion failed)
+        # to collect a limited number of differences.
+        with self.cache.timed('report', self.expected_file), self._differences(actual) as differences:
+            shown = list(itertools.islice(differences, self.max_differences + 1))
+
+        more = len(shown) > self.max_differences
+        return [
+            ''
+          , 'Comparing the test result'
+            + (f' (`{actual}`)' if isinstance(actual, pathlib.Path) else '')
+            + f' with the expected {self._KIND} file (`{self.expected_file}`):'
+          , '---[BEGIN expected vs actual differences]---'
+          , *itertools.chain.from_iterable(difference.report() for difference in shown[:self.max_differences])
+          , *([f'... (only the first {self.max_differences} differences are shown)'] if more else [])
+          , '---[END expected vs actual differences]---'
+          ]
+
+    # BEGIN Private members
+    def _equals(self, result: object) -> bool:
+        if self.store:
+            self._store_pattern_file(result)
+            pytest.skip(f'Pattern file saved to `{self.expected_file}`.')
+
+        if isinstance(result, pathlib.Path) and not result.exists():
+            pytest.skip(f'Result {self._KIND} file not found `{result}`')
+
+        if not self.cache.store.exists(self.expected_file):
+            pytest.skip(f'Expected {self._KIND} file not found `{self.expected_file}`')
+
+        with self.cache.timed('eq', self.expected_file):
+            if self.unordered_lists:
+                # Stop at the first difference
+                with self._differences(result) as differences:
+                    return next(differences, None) is None
+
+            # NOTE The builtin `==` is way faster than walking documents in Python,
+            # so differences are collected only to report the failed assertion.
+            with self._documents(result) as (actual, expected):
+                return all(
+                    actual_document == expected_document
+                    for actual_document, expected_document in itertools.zip_longest(
+                        actual, expected, fillvalue=_MISSING
+                      )
+                  )
+
+    @abc.abstractmethod
+    def _load_all(self, source: str | IO[str]) -> Iterable[object]:
+        ...
+
+    @abc.abstractmethod
+    def _dump(self, document: object) -> str:
+        ...
+
+    def _store_pattern_file(self, result: object) -> None:
+        assert self.store, 'Code review required!'
+
+        match result:
+            case pathlib.Path():
+                data = result.read_bytes()
+            case str():
+                data = result.encode('utf-8')
+            case _:
+                # NOTE Only here the result object gets serialized.
+                data = self._dump(result).encode('utf-8')
+
+        self.cache.write_bytes(self.expected_file, data)
+
+    @contextlib.contextmanager
+    def _differences(self, result: object) -> Iterator[Iterator[_StructuralDifference]]:
+        with self._documents(result) as (actual, expected):
+            yield _iter_document_differences(actual, expected, unordered_lists=self.unordered_lists)
+
+    @contextlib.contextmanager
+    def _documents(self, result: object) -> Iterator[tuple[Iterable[object], Iterable[object]]]:
+        # NOTE Load documents one by one, so only a single pair of them is in memory.
+        with contextlib.ExitStack() as stack:
+            expected = stack.enter_context(
+                contextlib.closing(self.cache.iter_documents(self.expected_file, self._load_all))
+              )
+
+            match result:
+                case pathlib.Path():
+                    actual = self._load_all(stack.enter_context(result.open('r', encoding='utf-8')))
+                case str():
+                    actual = self._load_all(result)
+                case _:
+                    # NOTE An object is compared as is, i.e., w/o serialization.
+                    actual = [result]
+
+            yield actual, expected
+    # END Private members
+
+
+@dataclass(eq=False)
+class _YAMLCheckOrStorePattern(_DocumentCheckOrStorePattern):
+    """Compare YAML documents."""
+
+    # NOTE Default to `yaml.SafeLoader` and `yaml.SafeDumper`.
+    loader: type[Any] | None = None
+    dumper: type[Any] | None = None
+
+    _KIND: ClassVar[str] = 'YAML'
+
+    # BEGIN Private members
+    def _load_all(self, source: str | IO[str]) -> Iterable[object]:
+        import yaml  # NOQA: PLC0415
+
+        return cast('Iterable[object]', yaml.load_all(source, Loader=self.loader or yaml.SafeLoader))
+
+    def _dump(self, document: object) -> str:
+        import yaml  # NOQA: PLC0415
+
+        return yaml.dump(document, Dumper=self.dumper or yaml.SafeDumper, allow_unicode=True, sort_keys=False)
+    # END Private members
+
+
+@dataclass(eq=False)
+class _JSONCheckOrStorePattern(_DocumentCheckOrStorePattern):
+    """Compare JSON documents."""
+
+    _KIND: ClassVar[str] = 'JSON'
+
+    # BEGIN Private members
+    def _load_all(self, source: str | IO[str]) -> Iterable[object]:
+        return [json.loads(source) if isinstance(source, str) else json.load(source)]
+
+    def _dump(self, document: object) -> str:
+        return json.dumps(document, ensure_ascii=False, indent=2) + '\n'
+    # END Private members
+
+
+def _get_yaml_class(config: pytest.Config, name: str) -> type[Any]:
+    import yaml  # NOQA: PLC0415
+
+    # NOTE `CSafeLoader` and `CSafeDumper` are available only
+    # if PyYAML has been built w/ `libyaml`.
+    cls = getattr(yaml, f'C{name}', None) if config.getini('pm-yaml-libyaml') else None
+    return cast('type[Any]', getattr(yaml, name) if cls is None else cls)
+
+
+def _get_document_check_params(request: pytest.FixtureRequest) -> dict[str, Any]:
+    return {
+        'store': request.config.getoption('--pm-save-patterns')
+      , 'cache': request.config.stash[PM_PATTERN_CACHE]
+      , 'max_differences': int(request.config.getini('pm-max-differences'))
+      , 'unordered_lists': request.config.getini('pm-unordered-lists')
+            or request.node.get_closest_marker('unordered_lists') is not None
+      }
+
+
 @pytest.fixture
 def expected_yaml(request: pytest.FixtureRequest) -> _YAMLCheckOrStorePattern:
     """Pytest fixture for matching YAML file content."""
     return _YAMLCheckOrStorePattern(
         _make_expected_filename(request, '.yaml')
-      , store=request.config.getoption('--pm-save-patterns')
+      , loader=_get_yaml_class(request.config, 'SafeLoader')
+      , dumper=_get_yaml_class(request.config, 'SafeDumper')
+      , **_get_document_check_params(request)
+      )
+
+
+@pytest.fixture
+def expected_json(request: pytest.FixtureRequest) -> _JSONCheckOrStorePattern:
+    """Pytest fixture for matching JSON file content."""
+    return _JSONCheckOrStorePattern(
+        _make_expected_filename(request, '.json')
+      , **_get_document_check_params(request)
       )
 
 
@@ -513,19 +2046,18 @@ class _UnusedFilesReporter:
             return
 
         patterns_base_dir = session.config.rootpath / _get_base_dir(session.config)
-        known_extensions = '.out', '.err'
+        known_extensions = set(PATTERN_FIXTURES.values())
 
         all_paths = {
             p.resolve()
-            for p in patterns_base_dir.rglob('*')
-            if p.is_file() and p.suffix in known_extensions
+            for p in session.config.stash[PM_PATTERN_CACHE].store.paths()
+            if p.suffix in known_extensions
           }
 
         collected_paths = {
-            _make_expected_filename(item._request, ext)     # type: ignore[attr-defined] # NOQA: SLF001
+            path
             for item in session.items
-            for fixture, ext in zip((expected_out, expected_err), known_extensions, strict=True)
-            if fixture.__name__ in item.fixturenames        # type: ignore[attr-defined]
+            for path in _item_expected_files(item, patterns_base_dir)
           }
 
         unused_paths = all_paths - collected_paths
@@ -535,6 +2067,441 @@ class _UnusedFilesReporter:
                 pytest.exit('Found unused pattern files', 1)
 
 
+class _ChangedPatternsFilter:
+    """Deselect tests whose pattern files haven't been changed.
+
+    Changes are detected against the pattern files state (mtime, size, and digest)
+    recorded in the ``pytest`` cache by the previous run, or against an explicit
+    list of changed files given in the command line. The state of pattern files
+    used by selected tests is recorded only if all of them passed, so failed
+    tests stay selected until they're fixed.
+
+    Under ``pytest-xdist`` the state is recorded by the controller, which gets
+    test outcomes from reports and selected tests from workers.
+    """
+    def __init__(self, changed_files: list[pathlib.Path] | None = None) -> None:
+        self._changed_files = (
+            {p.resolve() for p in changed_files}
+            if changed_files is not None
+            else None
+          )
+        self._rootpath = pathlib.Path()
+        self._store: _PatternStore | None = None
+        self._recorded: dict[str, list[Any]] = {}
+        self._seen: set[pathlib.Path] = set()
+        self._selected: dict[str, list[pathlib.Path]] = {}
+        self._passed: set[str] = set()
+        self._failed: set[str] = set()
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        """Load the pattern files state recorded by the previous run."""
+        self._rootpath = session.config.rootpath
+        self._store = session.config.stash[PM_PATTERN_CACHE].store
+        if self._changed_files is None:
+            self._recorded = session.config.cache.get(PM_CHANGED_ONLY_CACHE_KEY, {})
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config: pytest.Config, items: list[pytest.Item]) -> None:
+        """Keep only test items that use changed pattern files."""
+        base_dir = config.rootpath / _get_base_dir(config)
+        selected: list[pytest.Item] = []
+        deselected: list[pytest.Item] = []
+        for item in items:
+            paths = _item_expected_files(item, base_dir)
+            self._seen.update(paths)
+            if any(map(self._is_changed, paths)):
+                selected.append(item)
+                self._selected[item.nodeid] = paths
+            else:
+                deselected.append(item)
+
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        """Remember outcomes of selected tests."""
+        if report.failed:
+            self._failed.add(report.nodeid)
+        elif report.when == 'call' and report.passed:
+            self._passed.add(report.nodeid)
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        """Record the current state of pattern files for the next run."""
+        if self._changed_files is not None or session.config.option.collectonly:
+            return
+
+        # NOTE A `pytest-xdist` worker passes selected tests to the controller.
+        workeroutput = getattr(session.config, 'workeroutput', None)
+        if workeroutput is not None:
+            workeroutput[PM_CHANGED_ONLY_WORKER_OUTPUT] = {
+                nodeid: list(map(str, paths))
+                for nodeid, paths in self._selected.items()
+              }
+            return
+
+        # NOTE Keep the previous state of pattern files used by tests
+        # that failed, were skipped, or haven't run at all.
+        not_passed = {
+            path
+            for nodeid, paths in self._selected.items()
+            if nodeid not in self._passed or nodeid in self._failed
+            for path in paths
+          }
+        recorded = {**self._recorded}
+        for path in self._seen - not_passed:
+            key = self._cache_key(path)
+            if (state := self._file_state(path, recorded.get(key))) is not None:
+                recorded[key] = state
+            else:
+                recorded.pop(key, None)
+
+        session.config.cache.set(PM_CHANGED_ONLY_CACHE_KEY, recorded)
+
+    def add_selected(self, selected: dict[str, list[str]]) -> None:
+        """Add tests selected by a ``pytest-xdist`` worker."""
+        for nodeid, paths in selected.items():
+            self._selected[nodeid] = [pathlib.Path(path) for path in paths]
+            self._seen.update(self._selected[nodeid])
+
+    # BEGIN Private members
+    def _is_changed(self, path: pathlib.Path) -> bool:
+        if self._changed_files is not None:
+            return path.resolve() in self._changed_files
+
+        recorded = self._recorded.get(self._cache_key(path))
+        state = self._file_state(path, recorded)
+        if state is None or recorded is None:
+            return state is not recorded
+
+        # NOTE Compare digests only, so touched but unchanged files don't count.
+        return bool(state[-1] != recorded[-1])
+
+    def _cache_key(self, path: pathlib.Path) -> str:
+        return (
+            path.relative_to(self._rootpath).as_posix()
+            if path.is_relative_to(self._rootpath)
+            else path.as_posix()
+          )
+
+    def _file_state(self, path: pathlib.Path, recorded: list[Any] | None) -> list[Any] | None:
+        assert self._store is not None
+        return self._store.state(path, recorded)
+    # END Private members
+
+
+class _ChangedPatternsCollector:
+    """Merge tests selected by ``pytest-xdist`` workers into the controller's filter."""
+    def __init__(self, changed_filter: _ChangedPatternsFilter) -> None:
+        self._filter = changed_filter
+
+    def pytest_testnodedown(self, node: Any) -> None:       # NOQA: ANN401
+        """Collect tests selected by a finished worker."""
+        workeroutput = getattr(node, 'workeroutput', {})
+        self._filter.add_selected(workeroutput.get(PM_CHANGED_ONLY_WORKER_OUTPUT, {}))
+
+
+class _PatternsPrewarmer:
+    """Read pattern files of collected tests concurrently before running them."""
+    def __init__(self, cache: _PatternCache, *, compile_regex: bool = False) -> None:
+        self._cache = cache
+        self._compile_regex = compile_regex
+
+    def pytest_collection_finish(self, session: pytest.Session) -> None:
+        """Populate the pattern cache w/ pattern files of the selected tests."""
+        base_dir = session.config.rootpath / _get_base_dir(session.config)
+        paths = {
+            path
+            for item in session.items
+            for path in _item_expected_files(item, base_dir, TEXT_PATTERN_FIXTURES)
+          }
+
+        from concurrent.futures import ThreadPoolExecutor  # NOQA: PLC0415
+
+        # NOTE Reading files is I/O bound, so threads are good enough here.
+        with ThreadPoolExecutor() as executor:
+            # NOTE Consume results to re-raise unexpected errors.
+            for _ in executor.map(
+                functools.partial(self._cache.prewarm, compile_regex=self._compile_regex)
+              , paths
+              ):
+                pass
+
+
+class _SharedPatternsController:
+    """Give ``pytest-xdist`` workers a directory for the shared patterns snapshot."""
+    def __init__(self) -> None:
+        self._directory = pathlib.Path(tempfile.mkdtemp(prefix='pytest-matcher-'))
+
+    def pytest_configure_node(self, node: Any) -> None:     # NOQA: ANN401
+        """Pass the shared directory to a worker node."""
+        node.workerinput[PM_SHARED_CACHE_DIR] = str(self._directory)
+
+    def pytest_unconfigure(self) -> None:
+        """Remove the shared directory."""
+        import shutil  # NOQA: PLC0415
+
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class _SharedPatternsPublisher:
+    """Publish pattern files of collected tests to other ``pytest-xdist`` workers."""
+    def __init__(self, shared: _SharedPatterns, store: _PatternStore) -> None:
+        self._shared = shared
+        self._store = store
+
+    def pytest_collection_finish(self, session: pytest.Session) -> None:
+        """Write the shared patterns snapshot if no other worker did it yet."""
+        base_dir = session.config.rootpath / _get_base_dir(session.config)
+        self._shared.publish(
+            self._store
+          , dict.fromkeys(
+                path
+                for item in session.items
+                for path in _item_expected_files(item, base_dir, TEXT_PATTERN_FIXTURES)
+              )
+          )
+
+    def pytest_unconfigure(self) -> None:
+        """Unmap the shared patterns snapshot."""
+        self._shared.close()
+
+
+class _ProfileTimer:
+    """Measure the duration of a single matcher operation."""
+    __slots__ = ('_path', '_phase', '_profiler', '_start')
+
+    def __init__(self, profiler: _Profiler, phase: str, path: pathlib.Path | None) -> None:
+        self._profiler = profiler
+        self._phase = phase
+        self._path = path
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *_exc_info: object) -> None:
+        self._profiler.record(self._phase, self._path, time.perf_counter_ns() - self._start)
+
+
+@final
+class _Comparison:
+    """Record a single comparison of the test output with a pattern file."""
+    __slots__ = ('_cache', '_mode', '_output', '_path', 'result')
+
+    def __init__(self, cache: _PatternCache, mode: str, path: pathlib.Path, output: object) -> None:
+        self._cache = cache
+        self._mode = mode
+        self._path = path
+        self._output = output
+        self.result = False
+
+    def __enter__(self) -> _Comparison:
+        if self._cache.profiler is not None:
+            self._cache.profiler.begin_comparison()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_exc_info: object) -> None:
+        profiler = self._cache.profiler
+        if profiler is None:
+            return
+
+        if exc_type is None:
+            outcome = 'passed' if self.result else 'failed'
+        else:
+            outcome = 'skipped' if issubclass(exc_type, pytest.skip.Exception) else 'error'
+
+        # NOTE Sizes are collected only when profiling, cuz it might need to `stat()` files.
+        stat = self._cache.store.file_stat(self._path)
+        profiler.end_comparison(
+            mode=self._mode
+          , path=self._path
+          , pattern_size=None if stat is None else stat[1]
+          , output_size=_output_size(self._output)
+          , outcome=outcome
+          )
+
+
+def _output_size(output: object) -> int | None:
+    match output:
+        case str():
+            return len(output)
+        case bytes() | bytearray():
+            return len(output)
+        case memoryview():
+            return output.nbytes
+        case pathlib.Path():
+            with contextlib.suppress(OSError):
+                return output.stat().st_size
+    return None
+
+
+class _Profiler:
+    """Collect durations of matcher operations and report them at the session end."""
+    def __init__(
+        self
+      , rootpath: pathlib.Path
+      , *
+      , summary: bool
+      , stats_json: pathlib.Path | None
+      , regex_engine: str
+      ) -> None:
+        self._rootpath = rootpath
+        self._regex_engine = regex_engine
+        self._summary = summary
+        self._stats_json = stats_json
+        self._nodeid: str | None = None
+        self._durations: collections.Counter[str] | None = None
+        self._last: dict[tuple[str | None, str], dict[str, Any]] = {}
+        # NOTE Items are `(test ID, phase, pattern path, duration in ns)`.
+        self.timings: list[tuple[str | None, str, str | None, int]] = []
+        # NOTE Records of the `--pm-stats-json` file.
+        self.comparisons: list[dict[str, Any]] = []
+
+    def record(self, phase: str, path: pathlib.Path | None, elapsed_ns: int) -> None:
+        relative = None if path is None else self._relative(path)
+        self.timings.append((self._nodeid, phase, relative, elapsed_ns))
+
+        if self._durations is not None:
+            self._durations[phase] += elapsed_ns
+        # NOTE Mismatch reports are made after the comparison is over,
+        # so add them to the last comparison of the pattern file.
+        elif relative is not None and (last := self._last.get((self._nodeid, relative))) is not None:
+            last['durations_ns'][phase] = last['durations_ns'].get(phase, 0) + elapsed_ns
+
+    def begin_comparison(self) -> None:
+        self._durations = collections.Counter()
+
+    def end_comparison(
+        self
+      , *
+      , mode: str
+      , path: pathlib.Path
+      , pattern_size: int | None
+      , output_size: int | None
+      , outcome: str
+      ) -> None:
+        assert self._durations is not None, 'Code review required!'
+        pattern = self._relative(path)
+        record = {
+            'test': self._nodeid
+          , 'pattern': pattern
+          , 'pattern_size': pattern_size
+          , 'output_size': output_size
+          , 'mode': mode
+          , 'durations_ns': dict(self._durations)
+          , 'outcome': outcome
+          }
+        if mode == 'regex':
+            record['regex_engine'] = self._regex_engine
+        self._durations = None
+        self.comparisons.append(record)
+        self._last[self._nodeid, pattern] = record
+
+    def pytest_runtest_logstart(self, nodeid: str) -> None:
+        """Remember the currently running test."""
+        self._nodeid = nodeid
+
+    def pytest_runtest_logfinish(self) -> None:
+        """Forget the finished test."""
+        self._nodeid = None
+        self._last.clear()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        """Pass records of a ``pytest-xdist`` worker to the controller or write the stats file."""
+        workeroutput = getattr(session.config, 'workeroutput', None)
+        if workeroutput is not None:
+            workeroutput[PM_PROFILE_WORKER_OUTPUT] = self.timings
+            workerid = session.config.workerinput['workerid']   # type: ignore[attr-defined]
+            workeroutput[PM_STATS_WORKER_OUTPUT] = [record | {'worker': workerid} for record in self.comparisons]
+            return
+
+        if self._stats_json is not None:
+            self._stats_json.parent.mkdir(parents=True, exist_ok=True)
+            with self._stats_json.open('w', encoding='utf-8') as fd:
+                for record in self.comparisons:
+                    fd.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def pytest_terminal_summary(self, terminalreporter: pytest.TerminalReporter) -> None:
+        """Show totals per phase and the slowest patterns."""
+        if not self._summary or hasattr(terminalreporter.config, 'workerinput'):
+            return
+
+        terminalreporter.write_sep('=', 'pytest-matcher profile')
+        terminalreporter.write_line(f'Regular expressions engine: {self._regex_engine}')
+        if not self.timings:
+            terminalreporter.write_line('No matcher operations have been measured.')
+            return
+
+        phases: dict[str, list[int]] = {phase: [0, 0] for phase in PROFILE_PHASES}
+        patterns: collections.Counter[tuple[str | None, str]] = collections.Counter()
+        for nodeid, phase, path, elapsed_ns in self.timings:
+            phases[phase][0] += 1
+            phases[phase][1] += elapsed_ns
+            if path is not None:
+                patterns[path, nodeid or ''] += elapsed_ns
+
+        terminalreporter.write_line(f'{"phase":<10} {"calls":>8} {"total, ms":>12} {"mean, us":>12}')
+        for phase, (calls, total_ns) in phases.items():
+            if calls:
+                terminalreporter.write_line(
+                    f'{phase:<10} {calls:>8} {total_ns / 1e6:>12.3f} {total_ns / calls / 1e3:>12.1f}'
+                  )
+        total_ns = sum(total for _, total in phases.values())
+        terminalreporter.write_line(f'{"total":<10} {len(self.timings):>8} {total_ns / 1e6:>12.3f}')
+
+        terminalreporter.write_line('')
+        terminalreporter.write_line(f'Slowest patterns (top {_PROFILE_SLOWEST_COUNT}):')
+        for (path, nodeid), elapsed_ns in patterns.most_common(_PROFILE_SLOWEST_COUNT):
+            terminalreporter.write_line(f'{elapsed_ns / 1e6:>12.3f} ms  {path}' + (f' ({nodeid})' if nodeid else ''))
+
+    # BEGIN Private members
+    def _relative(self, path: pathlib.Path) -> str:
+        return str(path.relative_to(self._rootpath)) if path.is_relative_to(self._rootpath) else str(path)
+    # END Private members
+
+
+class _ProfileCollector:
+    """Merge records of ``pytest-xdist`` workers into the controller's profiler."""
+    def __init__(self, profiler: _Profiler) -> None:
+        self._profiler = profiler
+
+    def pytest_testnodedown(self, node: Any) -> None:       # NOQA: ANN401
+        """Collect records of a finished worker."""
+        workeroutput = getattr(node, 'workeroutput', {})
+        self._profiler.timings.extend(map(tuple, workeroutput.get(PM_PROFILE_WORKER_OUTPUT, [])))
+        self._profiler.comparisons.extend(workeroutput.get(PM_STATS_WORKER_OUTPUT, []))
+
+
+def _get_archive(config: pytest.Config) -> pathlib.Path | None:
+    result: pathlib.Path | None = config.getoption('--pm-patterns-archive')
+    if result is None and (archive := config.getini('pm-patterns-archive')):
+        result = pathlib.Path(archive)
+    return result
+
+
+def _make_pattern_store(config: pytest.Config) -> _PatternStore:
+    base_dir = config.rootpath / _get_base_dir(config)
+    archive = _get_archive(config)
+    if archive is not None:
+        return _ArchiveStore(config.rootpath / archive, base_dir)
+
+    compression = config.getini('pm-compression')
+    level = config.getini('pm-compression-level')
+    return _DirectoryStore(
+        base_dir
+      , compression=None if compression == 'none' else compression
+      , compression_level=int(level) if level else None
+      , digests_dir=(
+            config.cache.mkdir(PM_DIGEST_INDEX_CACHE_DIR)
+            if config.getini('pm-digest-index') and getattr(config, 'cache', None) is not None
+            else None
+          )
+      , dedup=config.getini('pm-dedup-patterns')
+      )
+
+
 def _get_mismatch_output_style(config: pytest.Config) -> _MismatchStyle:
     style_str = config.getoption('--pm-mismatch-style')
     if style_str is None:
@@ -543,6 +2510,321 @@ def _get_mismatch_output_style(config: pytest.Config) -> _MismatchStyle:
     return _MismatchStyle[style_str.upper()]
 
 
+def _maybe_import_or_export_archive(config: pytest.Config, store: _PatternStore) -> None:
+    do_import = config.getoption('--pm-archive-import')
+    do_export = config.getoption('--pm-archive-export')
+    if not (do_import or do_export):
+        return
+
+    if not isinstance(store, _ArchiveStore):
+        msg = 'The `--pm-archive-import` and `--pm-archive-export` options require `pm-patterns-archive`'
+        raise pytest.UsageError(msg)
+
+    if do_import and do_export:
+        msg = 'The `--pm-archive-import` and `--pm-archive-export` options are mutually exclusive'
+        raise pytest.UsageError(msg)
+
+    if do_import:
+        count = store.import_directory()
+        pytest.exit(f'Imported {count} pattern files from `{store.base_dir}` into `{store.archive}`', 0)
+
+    count = store.export_directory()
+    pytest.exit(f'Exported {count} pattern files from `{store.archive}` into `{store.base_dir}`', 0)
+
+
+@dataclass(frozen=True)
+class _LintProblem:
+    path: pathlib.Path
+    line: int | None
+    message: str
+    warning: bool = False
+
+    def __str__(self) -> str:
+        location = f'{self.path}:{self.line}' if self.line is not None else f'{self.path}'
+        return f'{location}: warning: {self.message}' if self.warning else f'{location}: {self.message}'
+
+
+def _plural(count: int, noun: str) -> str:
+    return f'{count} {noun}' if count == 1 else f'{count} {noun}s'
+
+
+def _has_nested_quantifiers(items: Iterable[Any]) -> bool:
+    parser = _regex_parser()
+    for op, av in items:
+        if op in (parser.MAX_REPEAT, parser.MIN_REPEAT):
+            _, high, body = av
+            if (high == parser.MAXREPEAT and _is_repeats_only(body)) or _has_nested_quantifiers(body):
+                return True
+        elif op == parser.SUBPATTERN:
+            if _has_nested_quantifiers(av[-1]):
+                return True
+        elif op == parser.BRANCH and any(map(_has_nested_quantifiers, av[1])):
+            return True
+        # NOTE Atomic groups and possessive quantifiers never backtrack.
+    return False
+
+
+def _is_repeats_only(items: Iterable[Any]) -> bool:
+    # NOTE A repeated body that consists of repeats only (e.g., `(a+)+` or `(\w+\s?)*`)
+    # can be split among iterations in exponentially many ways.
+    parser = _regex_parser()
+    items = list(items)
+    while len(items) == 1 and items[0][0] == parser.SUBPATTERN:
+        items = list(items[0][1][-1])
+    repeats = [av for op, av in items if op in (parser.MAX_REPEAT, parser.MIN_REPEAT)]
+    return bool(repeats) and len(repeats) == len(items) and any(high == parser.MAXREPEAT for _, high, _ in repeats)
+
+
+@functools.cache
+def _regex_parser() -> types.ModuleType:
+    # NOTE The parser of the `re` module is an implementation detail
+    # (and has been renamed in Python 3.11), so import it by name.
+    return importlib.import_module('sre_parse' if sys.version_info < (3, 11) else 're._parser')
+
+
+def _lint_regex(path: pathlib.Path, content: str, engine: _RegexEngine) -> Iterator[_LintProblem]:
+    # NOTE The same leading lines are stripped by `_pattern_to_regex()`.
+    first_line = len(content.splitlines()) - len(content.lstrip().splitlines()) + 1
+    lines = content.strip().splitlines()
+    # Offsets of lines in the regex made from the pattern (lines joined by a space)
+    offsets = list(itertools.accumulate((len(line) + 1 for line in lines), initial=0))
+
+    def line_at(offset: int) -> int:
+        return first_line + max(bisect.bisect_right(offsets, offset) - 1, 0)
+
+    try:
+        engine.compile(_pattern_to_regex(content, _RE_NOFLAG))
+    except engine.error as ex:
+        # NOTE Only the `re` and `regex` modules report the error position.
+        pos = getattr(ex, 'pos', None)
+        message = getattr(ex, 'msg', str(ex))
+        # NOTE The same pattern files are compared literally as well, so
+        # it's not known if the file is supposed to be a regex.
+        yield _LintProblem(
+            path
+          , None if pos is None else line_at(pos)
+          , f'invalid regular expression: {message}'
+          , warning=True
+          )
+        return
+
+    if engine.linear:
+        return
+
+    for m in _ADJACENT_WILDCARDS_RE.finditer(' '.join(lines)):
+        message = f'adjacent wildcards `{m.group()}` may cause catastrophic backtracking'
+        yield _LintProblem(path, line_at(m.start()), message)
+
+    for n, line in enumerate(lines, start=first_line):
+        try:
+            tree = _regex_parser().parse(line)
+        except re.error:
+            # NOTE A line may be a part of a multi-line construct.
+            continue
+        if _has_nested_quantifiers(tree):
+            yield _LintProblem(path, n, 'nested quantifiers may cause catastrophic backtracking')
+
+
+def _lint_pattern_file(
+    store: _PatternStore
+  , engine: _RegexEngine
+  , max_size: int
+  , path: pathlib.Path
+  ) -> list[_LintProblem]:
+    stat = store.file_stat(path)
+    if stat is not None and stat[1] > max_size:
+        return [_LintProblem(path, None, f'the pattern file is too big ({stat[1]} > {max_size} bytes)')]
+
+    if path.suffix not in REGEX_PATTERN_SUFFIXES:
+        return []
+
+    try:
+        content = store.read_text(path)
+    except (OSError, UnicodeDecodeError) as ex:
+        return [_LintProblem(path, None, f'the pattern file cannot be read: {ex!s}')]
+
+    return list(_lint_regex(path, content, engine))
+
+
+def _maybe_lint_patterns(config: pytest.Config, cache: _PatternCache) -> None:
+    if not config.getoption('--pm-lint-patterns'):
+        return
+
+    store = cache.store
+    max_size = int(config.getini('pm-lint-max-size')) * 1024
+
+    paths = sorted(store.paths())
+    from concurrent.futures import ThreadPoolExecutor  # NOQA: PLC0415
+
+    # NOTE Reading files is I/O bound, so threads are good enough here.
+    with ThreadPoolExecutor() as executor:
+        problems = list(
+            itertools.chain.from_iterable(
+                executor.map(
+                    functools.partial(_lint_pattern_file, store, cache.engine, max_size)
+                  , paths
+                  )
+              )
+          )
+
+    if problems:
+        sys.stdout.write('\n'.join(map(str, problems)) + '\n')
+
+    errors = [problem for problem in problems if not problem.warning]
+    warnings = len(problems) - len(errors)
+    note = f' ({_plural(warnings, "warning")})' if warnings else ''
+    if errors:
+        files = _plural(len({problem.path for problem in errors}), 'pattern file')
+        pytest.exit(f'Found {_plural(len(errors), "problem")} in {files}{note}', 1)
+
+    pytest.exit(f'No problems found in {_plural(len(paths), "pattern file")}{note}', 0)
+
+
+def _register_changed_patterns_filter(config: pytest.Config) -> None:
+    changed_files = config.getoption('--pm-changed-files')
+    if changed_files is None and not config.getoption('--pm-changed-only'):
+        return
+
+    if changed_files is None and getattr(config, 'cache', None) is None:
+        msg = 'The `--pm-changed-only` option requires the `cacheprovider` plugin'
+        raise pytest.UsageError(msg)
+
+    invocation_dir = config.invocation_params.dir
+    changed_filter = _ChangedPatternsFilter(
+        [invocation_dir / p for p in changed_files]
+        if changed_files is not None
+        else None
+      )
+    config.pluginmanager.register(changed_filter, 'pm-changed-patterns-filter')
+
+    # NOTE Workers pass selected tests to the `pytest-xdist` controller.
+    if (
+        changed_files is None
+        and not hasattr(config, 'workerinput')
+        and config.pluginmanager.hasplugin('xdist')
+        and getattr(config.option, 'dist', 'no') != 'no'
+      ):
+        config.pluginmanager.register(_ChangedPatternsCollector(changed_filter), 'pm-changed-patterns-collector')
+
+
+def _register_patterns_prewarmer(config: pytest.Config) -> None:
+    compile_regex = config.getoption('--pm-prewarm-regex')
+    # NOTE Nothing to prewarm when patterns are going to be (over)written.
+    if not (config.getoption('--pm-prewarm') or compile_regex) or config.getoption('--pm-save-patterns'):
+        return
+
+    config.pluginmanager.register(
+        _PatternsPrewarmer(config.stash[PM_PATTERN_CACHE], compile_regex=compile_regex)
+      , 'pm-patterns-prewarmer'
+      )
+
+
+def _register_profiler(config: pytest.Config) -> None:
+    summary = config.getoption('--pm-profile')
+    stats_json = config.getoption('--pm-stats-json')
+    if not summary and stats_json is None:
+        return
+
+    cache = config.stash[PM_PATTERN_CACHE]
+    profiler = _Profiler(
+        config.rootpath
+      , summary=summary
+      , stats_json=None if stats_json is None else config.invocation_params.dir / stats_json
+      , regex_engine=cache.engine.name
+      )
+    cache.profiler = profiler
+    config.pluginmanager.register(profiler, 'pm-profiler')
+
+    # NOTE Workers pass their records to the `pytest-xdist` controller.
+    if (
+        not hasattr(config, 'workerinput')
+        and config.pluginmanager.hasplugin('xdist')
+        and getattr(config.option, 'dist', 'no') != 'no'
+      ):
+        config.pluginmanager.register(_ProfileCollector(profiler), 'pm-profile-collector')
+
+
+def _register_shared_patterns(config: pytest.Config) -> None:
+    # NOTE Nothing to share when patterns are going to be (over)written.
+    if not config.getoption('--pm-xdist-shared-cache') or config.getoption('--pm-save-patterns'):
+        return
+
+    workerinput = getattr(config, 'workerinput', None)
+    if workerinput is None:
+        # This is a `pytest-xdist` controller or the plugin isn't used at all
+        if config.pluginmanager.hasplugin('xdist') and getattr(config.option, 'dist', 'no') != 'no':
+            config.pluginmanager.register(_SharedPatternsController(), 'pm-shared-patterns-controller')
+        return
+
+    if (directory := workerinput.get(PM_SHARED_CACHE_DIR)) is not None:
+        shared = _SharedPatterns(pathlib.Path(directory))
+        cache = config.stash[PM_PATTERN_CACHE]
+        cache.shared = shared
+        config.pluginmanager.register(
+            _SharedPatternsPublisher(shared, cache.store)
+          , 'pm-shared-patterns-publisher'
+          )
+
+
+def _validate_pattern_file_fmt(pattern_file_fmt: str) -> None:
+    try:
+        formatter = string.Formatter()
+        placeholders = [
+            placeholder
+            for _, placeholder, _, _ in formatter.parse(pattern_file_fmt)
+            if placeholder
+          ]
+
+        if not bool(placeholders):
+            msg = "'pm-pattern-file-fmt' should have at least one placeholder"
+            raise pytest.UsageError(msg)
+
+        supported = ['module', 'class', 'fn', 'callspec', 'suffix', 'shard']
+        unsupported = [f"'{item}'" for item in placeholders if item not in supported]
+
+        if unsupported:
+            plural = 's' if len(unsupported) > 1 else ''
+            msg = f"'pm-pattern-file-fmt' has invalid placeholder{plural}: {', '.join(unsupported)}"
+            raise pytest.UsageError(msg)
+
+    except ValueError as ex:
+        msg = f"'pm-pattern-file-fmt' has incorrect format: {str(ex).lower()}"
+        raise pytest.UsageError(msg) from ex
+
+
+def _validate_compression(config: pytest.Config) -> None:
+    compression = config.getini('pm-compression')
+    if compression != 'none' and compression not in COMPRESSED_SUFFIXES.values():
+        msg = (
+            f"'pm-compression' option have an invalid value `{compression}`. "
+            "Valid values are: `none`, `gz`, `xz`."
+          )
+        raise pytest.UsageError(msg)
+
+    level = config.getini('pm-compression-level')
+    if level and re.fullmatch('[0-9]', level) is None:
+        msg = f"'pm-compression-level' option have an invalid value `{level}`. Valid values are: 0-9."
+        raise pytest.UsageError(msg)
+
+
+def _validate_document_options(config: pytest.Config) -> None:
+    cache_size = config.getini('pm-documents-cache-size')
+    if re.fullmatch('[0-9]+', cache_size) is None:
+        msg = (
+            f"'pm-documents-cache-size' option have an invalid value `{cache_size}`. "
+            'Valid values are non-negative integers.'
+          )
+        raise pytest.UsageError(msg)
+
+    max_differences = config.getini('pm-max-differences')
+    if re.fullmatch('[1-9][0-9]*', max_differences) is None:
+        msg = (
+            f"'pm-max-differences' option have an invalid value `{max_differences}`. "
+            'Valid values are positive integers.'
+          )
+        raise pytest.UsageError(msg)
+
+
 # BEGIN Pytest hooks
 
 def pytest_assertrepr_compare(                              # NOQA: PLR0911
@@ -572,12 +2854,18 @@ def pytest_assertrepr_compare(                              # NOQA: PLR0911
                   )
 
             # Enhance YAML checker failures
-            case _YAMLCheckOrStorePattern() as left, pathlib.Path() as right:
+            case _DocumentCheckOrStorePattern() as left, _:
                 return left.report_compare_mismatch(right)
 
-            case pathlib.Path() as left, _YAMLCheckOrStorePattern() as right:
+            case _, _DocumentCheckOrStorePattern() as right:
                 return right.report_compare_mismatch(left)
 
+            case (
+                (_BytesCheckOrStorePattern() as checker, bytes() | bytearray() | memoryview() as data)
+              | (bytes() | bytearray() | memoryview() as data, _BytesCheckOrStorePattern() as checker)
+              ):
+                return checker.report_compare_mismatch(data)
+
     elif op == 'is':
         match left, right:
             case _ContentMatchResult() as left,  bool(right):
@@ -608,11 +2896,70 @@ def pytest_addoption(parser: pytest.Parser) -> None:
       , help='Base directory used for storing pattern files.'
       , type=pathlib.Path
       )
+    group.addoption(
+        '--pm-patterns-archive'
+      , metavar='PATH'
+      , help='SQLite database used for storing pattern files instead of the base directory.'
+      , type=pathlib.Path
+      )
+    group.addoption(
+        '--pm-archive-import'
+      , action='store_true'
+      , help='Import pattern files from the base directory into the patterns archive and exit.'
+      )
+    group.addoption(
+        '--pm-archive-export'
+      , action='store_true'
+      , help='Export pattern files from the patterns archive into the base directory and exit.'
+      )
+    group.addoption(
+        '--pm-lint-patterns'
+      , action='store_true'
+      , help='Check pattern files for invalid or expensive regular expressions and exit.'
+      )
     group.addoption(
         '--pm-reveal-unused-files'
       , action='store_true'
       , help='reveal and print unused pattern files'
       )
+    group.addoption(
+        '--pm-prewarm'
+      , action='store_true'
+      , help='Read pattern files of collected tests concurrently before running them.'
+      )
+    group.addoption(
+        '--pm-prewarm-regex'
+      , action='store_true'
+      , help='Same as `--pm-prewarm` but also precompile regular expressions from the pattern files.'
+      )
+    group.addoption(
+        '--pm-profile'
+      , action='store_true'
+      , help='Measure durations of pattern files reading, matching, and writing, and show the slowest patterns.'
+      )
+    group.addoption(
+        '--pm-stats-json'
+      , metavar='PATH'
+      , type=pathlib.Path
+      , help='Write a JSON-lines record with sizes, durations, and outcome of every pattern comparison.'
+      )
+    group.addoption(
+        '--pm-xdist-shared-cache'
+      , action='store_true'
+      , help='Share pattern files content between `pytest-xdist` workers via a memory-mapped snapshot.'
+      )
+    group.addoption(
+        '--pm-changed-only'
+      , action='store_true'
+      , help='Run only tests whose pattern files have changed since the previous run.'
+      )
+    group.addoption(
+        '--pm-changed-files'
+      , metavar='PATH'
+      , action='append'
+      , type=pathlib.Path
+      , help='Run only tests that use the given (changed) pattern file. Can be repeated.'
+      )
 
     # Also add INI file (TOML table) options
     parser.addini(
@@ -620,9 +2967,87 @@ def pytest_addoption(parser: pytest.Parser) -> None:
       , help='Base directory used for storing pattern files.'
       , default=pathlib.Path('tests/data/expected')
       )
+    parser.addini(
+        'pm-patterns-archive'
+      , help='SQLite database used for storing pattern files instead of the base directory.'
+      , type='string'
+      , default=''
+      )
+    parser.addini(
+        'pm-compression'
+      , help='Compression used for saved pattern files: `none`, `gz`, or `xz`.'
+      , type='string'
+      , default='none'
+      )
+    parser.addini(
+        'pm-compression-level'
+      , help='Compression level used for saved pattern files (0-9).'
+      , type='string'
+      , default=''
+      )
+    parser.addini(
+        'pm-dedup-patterns'
+      , help='Store identical saved pattern content once and hard link pattern files to it.'
+      , type='bool'
+      , default=False
+      )
+    parser.addini(
+        'pm-bytes-encoding'
+      , help='Encoding of the output matched in bytes mode by the `match()` function.'
+      , type='string'
+      , default='utf-8'
+      )
+    parser.addini(
+        'pm-lint-max-size'
+      , help='Maximum size (in KiB) of a pattern file accepted by the `--pm-lint-patterns` option.'
+      , type='string'
+      , default='1024'
+      )
+    parser.addini(
+        'pm-normalize'
+      , help=f'Normalization steps applied to the text output before comparison: {", ".join(NORMALIZE_STEPS)}.'
+      , type='args'
+      , default=[]
+      )
+    parser.addini(
+        'pm-regex-engine'
+      , help=f'Regular expressions engine used by the `match()` function: {", ".join(REGEX_ENGINES)}.'
+      , type='string'
+      , default='re'
+      )
+    parser.addini(
+        'pm-yaml-libyaml'
+      , help='Use the `libyaml` based YAML loader when PyYAML has been built with it.'
+      , type='bool'
+      , default=True
+      )
+    parser.addini(
+        'pm-documents-cache-size'
+      , help='Size (in MiB) of source YAML and JSON documents to keep parsed. Zero disables the cache.'
+      , type='string'
+      , default='64'
+      )
+    parser.addini(
+        'pm-max-differences'
+      , help='Maximum number of differences shown when YAML or JSON documents do not match.'
+      , type='string'
+      , default='10'
+      )
+    parser.addini(
+        'pm-unordered-lists'
+      , help='Compare lists in YAML and JSON documents regardless of the order of their items.'
+      , type='bool'
+      , default=False
+      )
+    parser.addini(
+        'pm-digest-index'
+      , help='Record digests of saved text patterns in the pytest cache and use them to check equality.'
+      , type='bool'
+      , default=False
+      )
     parser.addini(
         'pm-pattern-file-fmt'
-      , help='pattern filename format can use placeholders: `module`, `class`, `fn`, `callspec`, `system`'
+      , help='pattern filename format can use placeholders: `module`, `class`, `fn`, `callspec`, `suffix`, `shard`'
       , type='string'
       , default='{module}/{class}/{fn}{callspec}{suffix}'
       )
@@ -645,6 +3070,14 @@ def pytest_configure(config: pytest.Config) -> None:
         'markers'
       , 'on_store(**kwargs): patch an expected pattern before store'
       )
+    config.addinivalue_line(
+        'markers'
+      , 'unordered_lists: compare lists in YAML documents regardless of the order of their items'
+      )
+    config.addinivalue_line(
+        'markers'
+      , 'normalize(*steps): normalize the text output before comparison'
+      )
 
     # Make sure the patterns base directory isn't an absolute path!
     basedir = _get_base_dir(config)
@@ -655,38 +3088,35 @@ def pytest_configure(config: pytest.Config) -> None:
     def _path_have_dot_dot(path: pathlib.Path) -> bool:
         return any(part == '..' for part in path.parts)
 
-    # Prevent directory traversal in # `pm-pattern-file-fmt`
-    # and `pm-patterns-base-dir` parameters!
+    # Prevent directory traversal in # `pm-pattern-file-fmt`,
+    # `pm-patterns-base-dir`, and `pm-patterns-archive` parameters!
     pattern_file_fmt = config.getini('pm-pattern-file-fmt')
     if any(map(_path_have_dot_dot, (basedir, pathlib.Path(pattern_file_fmt)))):
         msg = 'Directory traversal is not allowed for `pm-pattern-file-fmt` or `pm-patterns-base-dir` option'
         raise pytest.UsageError(msg)
 
+    archive = _get_archive(config)
+    if archive is not None and (archive.is_absolute() or _path_have_dot_dot(archive)):
+        msg = 'The patterns archive path must be relative and must not contain `..`'
+        raise pytest.UsageError(msg)
+
     # Make sure the `pm-pattern-file-fmt` format string is correct
     # and there are only known placeholders!
-    try:
-        formatter = string.Formatter()
-        placeholders = [
-            placeholder
-            for _, placeholder, _, _ in formatter.parse(pattern_file_fmt)
-            if placeholder
-          ]
-
-        if not bool(placeholders):
-            msg = "'pm-pattern-file-fmt' should have at least one placeholder"
-            raise pytest.UsageError(msg)
+    _validate_pattern_file_fmt(pattern_file_fmt)
 
-        supported = ['module', 'class', 'fn', 'callspec', 'suffix']
-        unsupported = [f"'{item}'" for item in placeholders if item not in supported]
+    _validate_compression(config)
+    _check_encoding(config.getini('pm-bytes-encoding'))
+    _check_normalize_steps(config.getini('pm-normalize'), "'pm-normalize' option")
 
-        if unsupported:
-            plural = 's' if len(unsupported) > 1 else ''
-            msg = f"'pm-pattern-file-fmt' has invalid placeholder{plural}: {', '.join(unsupported)}"
-            raise pytest.UsageError(msg)
+    _validate_document_options(config)
 
-    except ValueError as ex:
-        msg = f"'pm-pattern-file-fmt' has incorrect format: {str(ex).lower()}"
-        raise pytest.UsageError(msg) from ex
+    lint_max_size = config.getini('pm-lint-max-size')
+    if re.fullmatch('[1-9][0-9]*', lint_max_size) is None:
+        msg = (
+            f"'pm-lint-max-size' option have an invalid value `{lint_max_size}`. "
+            'Valid values are positive integers.'
+          )
+        raise pytest.UsageError(msg)
 
     # Validate `pm-mismatch-style` option value.
     style_str = config.getini('pm-mismatch-style')
@@ -698,6 +3128,20 @@ def pytest_configure(config: pytest.Config) -> None:
         raise pytest.UsageError(msg)
 
     config.stash[PM_COLOR_OUTPUT] = should_do_markup(sys.stdout)
+    store = _make_pattern_store(config)
+    config.stash[PM_PATTERN_CACHE] = _PatternCache(
+        store
+      , documents=_ParsedDocuments(int(config.getini('pm-documents-cache-size')) * 1024 * 1024)
+      , batch_writes=config.getoption('--pm-save-patterns')
+      , engine=_get_regex_engine(config)
+      )
+    _maybe_import_or_export_archive(config, store)
+    _maybe_lint_patterns(config, config.stash[PM_PATTERN_CACHE])
+
+    _register_changed_patterns_filter(config)
+    _register_shared_patterns(config)
+    _register_patterns_prewarmer(config)
+    _register_profiler(config)
 
     if not config.getoption('--pm-reveal-unused-files'):
         return
@@ -708,4 +3152,27 @@ def pytest_configure(config: pytest.Config) -> None:
     config.pluginmanager.unregister(name='terminalreporter')
     config.pluginmanager.register(reporter, 'terminalreporter')
 
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Write saved pattern files."""
+    cache = session.config.stash[PM_PATTERN_CACHE]
+    cache.flush()
+
+    # NOTE Saved pattern files may unlink deduplicated objects. Workers of
+    # `pytest-xdist` leave them to the controller, as others may still save.
+    if (
+        session.config.getoption('--pm-save-patterns')
+        and not hasattr(session.config, 'workerinput')
+        and isinstance(cache.store, _DirectoryStore)
+      ):
+        cache.store.prune_objects()
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """Release resources held by the pattern store."""
+    cache = config.stash.get(PM_PATTERN_CACHE, None)
+    if cache is not None and isinstance(cache.store, _ArchiveStore):
+        cache.store.close()
+
 # END Pytest hooks
@@ -4,12 +4,18 @@
 #
 
 # Standard imports
+import gzip
+import hashlib
+import json
+import lzma
+import os
 import pathlib
 import platform
 from typing import Final
 
 # Third party packages
 import pytest
+import yaml
 
 
 def no_file_test(ourtestdir) -> None:
@@ -227,10 +233,33 @@ def yaml_match_failure_test(ourtestdir, expectdir) -> None:
     result = ourtestdir.runpytest()
     result.assert_outcomes(failed=1)
     result.stdout.fnmatch_lines([
-        'E         ---[BEGIN actual result]---'
-      , 'E         ---[END actual result]---'
-      , 'E         ---[BEGIN expected result]---'
-      , 'E         ---[END expected result]---'
+        'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         simple-array[0]'
+      , "E           - 'dua'"
+      , "E           + 'satu'"
+      , 'E         simple-array[1]'
+      , "E           - 'tiga'"
+      , "E           + 'dua'"
+      , 'E         simple-array[2]'
+      , "E           - 'satu'"
+      , "E           + 'tiga'"
+      , 'E         some-key'
+      , 'E           - <missing>'
+      , "E           + 'some-value'"
+      , 'E         ---[END expected vs actual differences]---'
+      ])
+
+    # Limit the number of reported differences
+    result = ourtestdir.runpytest('-o', 'pm-max-differences=2')
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         simple-array[0]'
+      , '*'
+      , 'E         simple-array[1]'
+      , '*'
+      , 'E         ... (only the first 2 differences are shown)'
+      , 'E         ---[END expected vs actual differences]---'
       ])
 
 
@@ -667,3 +696,1198 @@ def repr_test(ourtestdir) -> None:
     result.stdout.re_match_lines([
         "repr_test: expected_out=\\(pattern_filename='.*/test_repr.out', pattern='Hello Africa!'\\)"
       ])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def changed_only_test(ourtestdir) -> None:
+    # Write sample expectation files
+    ourtestdir.makefile('.out', test_a='Hello Africa!', test_b='Hello Asia!')
+
+    # Write sample tests (and one that doesn't use patterns at all)
+    ourtestdir.makepyfile("""
+        def test_a(capfd, expected_out):
+            print('Hello Africa!', end='')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+
+        def test_b(capfd, expected_out):
+            print('Hello Asia!', end='')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+
+        def test_c():
+            pass
+        """
+      )
+
+    # The very first run has nothing recorded, so all tests w/ patterns are selected
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(passed=2, deselected=1)
+
+    # Nothing has changed since the previous run
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(deselected=3)
+
+    # Touched but unchanged file doesn't count
+    os.utime(ourtestdir.path / 'test_a.out', ns=(0, 0))
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(deselected=3)
+
+    # Edit a pattern file
+    (ourtestdir.path / 'test_b.out').write_text('Hello Antarctica!')
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(failed=1, deselected=2)
+
+    # The failed test stays selected until it passes
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(failed=1, deselected=2)
+
+    # Reverted pattern file is the same as at the last passed run
+    (ourtestdir.path / 'test_b.out').write_text('Hello Asia!')
+    result = ourtestdir.runpytest('--pm-changed-only')
+    result.assert_outcomes(deselected=3)
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def changed_only_xdist_test(ourtestdir, tmp_path) -> None:
+    # Write sample expectation files
+    ourtestdir.makefile('.out', test_a='Hello Africa!', test_b='Hello Asia!')
+
+    # Write sample tests
+    ourtestdir.makepyfile("""
+        def test_a(expected_out): pass
+        def test_b(expected_out): pass
+        def test_c(): pass
+        """
+      )
+
+    # A `pytest-xdist` worker passes selected tests to the controller
+    # and records nothing by itself
+    ourtestdir.makeconftest(f"""
+        import json
+        import pytest
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_configure(config):
+            config.workerinput = {{'workerid': 'gw0'}}
+            config.workeroutput = {{}}
+
+        def pytest_unconfigure(config):
+            with open({str(tmp_path / 'workeroutput.json')!r}, 'w') as fd:
+                json.dump(config.workeroutput, fd)
+        """
+      )
+    result = ourtestdir.runpytest('--pm-changed-only', '-p', 'no:randomly')
+    result.assert_outcomes(passed=2, deselected=1)
+    workeroutput = json.loads((tmp_path / 'workeroutput.json').read_text())
+    assert sorted(workeroutput['pm_changed_only_selection']) == [
+        'changed_only_xdist_test.py::test_a'
+      , 'changed_only_xdist_test.py::test_b'
+      ]
+
+    result = ourtestdir.runpytest('--pm-changed-only', '-p', 'no:randomly')
+    result.assert_outcomes(passed=2, deselected=1)
+
+    # The controller doesn't collect tests, but gets their reports and
+    # selected tests from workers
+    ourtestdir.makeconftest(f"""
+        import json
+        import pytest
+        from pytest_matcher.plugin import _ChangedPatternsCollector
+
+        class Node:
+            with open({str(tmp_path / 'workeroutput.json')!r}) as fd:
+                workeroutput = json.load(fd)
+
+        def pytest_collection_modifyitems(items):
+            items[:] = []
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_sessionfinish(session):
+            for nodeid, outcome in [('test_a', 'passed'), ('test_b', 'failed')]:
+                session.config.hook.pytest_runtest_logreport(
+                    report=pytest.TestReport(
+                        f'changed_only_xdist_test.py::{{nodeid}}', ('', 0, ''), {{}}, outcome, None, 'call'
+                      )
+                  )
+            changed_filter = session.config.pluginmanager.get_plugin('pm-changed-patterns-filter')
+            _ChangedPatternsCollector(changed_filter).pytest_testnodedown(Node)
+        """
+      )
+    ourtestdir.runpytest('--pm-changed-only')
+
+    # Only the passed test is deselected now
+    (ourtestdir.path / 'conftest.py').unlink()
+    result = ourtestdir.runpytest('--pm-changed-only', '-p', 'no:randomly')
+    result.assert_outcomes(passed=1, deselected=2)
+    result.stdout.fnmatch_lines(['*::test_b PASSED*'])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def changed_files_test(ourtestdir) -> None:
+    # Write sample expectation files
+    ourtestdir.makefile('.out', test_a='Hello Africa!', test_b='Hello Asia!')
+
+    # Write sample tests
+    ourtestdir.makepyfile("""
+        def test_a(expected_out): pass
+        def test_b(expected_out): pass
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-changed-files', 'test_b.out')
+    result.assert_outcomes(passed=1, deselected=1)
+    result.stdout.fnmatch_lines(['*::test_b PASSED*'])
+
+
+@pytest.mark.parametrize('option', ['--pm-prewarm', '--pm-prewarm-regex'])
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def prewarm_test(ourtestdir, option: str) -> None:
+    # Write sample expectation files
+    ourtestdir.makefile('.out', test_eq='Hello Africa!', test_regex='Hello .*!')
+
+    # Write sample tests that remove pattern files before comparison,
+    # so the only way to pass is to get the content from the cache.
+    ourtestdir.makepyfile("""
+        def test_eq(expected_out):
+            expected_out.pattern_filename.unlink()
+            assert expected_out == 'Hello Africa!'
+
+        def test_regex(expected_out):
+            expected_out.pattern_filename.unlink()
+            assert expected_out.match('Hello Asia!') == True
+        """
+      )
+
+    result = ourtestdir.runpytest(option)
+    result.assert_outcomes(passed=2)
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def prewarm_error_test(ourtestdir) -> None:
+    ourtestdir.makefile('.out', test_eq='Hello Africa!')
+    # Make the pattern store fail unexpectedly
+    ourtestdir.makeconftest("""
+        import sqlite3
+        import pytest
+        from pytest_matcher.plugin import PM_PATTERN_CACHE
+
+        def identity(path):
+            raise sqlite3.OperationalError('database is locked')
+
+        @pytest.hookimpl(trylast=True)
+        def pytest_configure(config):
+            config.stash[PM_PATTERN_CACHE].store.identity = identity
+        """
+      )
+    ourtestdir.makepyfile("""
+        def test_eq(expected_out):
+            assert expected_out == 'Hello Africa!'
+        """
+      )
+
+    # Unexpected errors must not be swallowed by the prewarming threads
+    result = ourtestdir.runpytest('--pm-prewarm')
+    assert result.ret == pytest.ExitCode.INTERNAL_ERROR
+    result.stdout.fnmatch_lines(['INTERNALERROR>*OperationalError: database is locked'])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def xdist_shared_cache_test(ourtestdir, tmp_path) -> None:
+    # Pretend to be a `pytest-xdist` worker
+    shared_dir = tmp_path / 'shared'
+    shared_dir.mkdir()
+    ourtestdir.makeconftest(f"""
+        import pytest
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_configure(config):
+            config.workerinput = {{'workerid': 'gw0', 'pm_shared_cache_dir': {str(shared_dir)!r}}}
+        """
+      )
+    # Write a sample expectations file
+    ourtestdir.makefile('.out', test_shared='Hello Africa!')
+
+    # The first "worker" publishes the snapshot
+    ourtestdir.makepyfile("""
+        def test_shared(expected_out):
+            assert expected_out == 'Hello Africa!'
+        """
+      )
+    result = ourtestdir.runpytest('--pm-xdist-shared-cache')
+    result.assert_outcomes(passed=1)
+    assert (shared_dir / 'patterns.snapshot').exists()
+
+    # The second one gets the content from the snapshot
+    ourtestdir.makepyfile("""
+        def test_shared(expected_out):
+            expected_out.pattern_filename.unlink()
+            assert expected_out == 'Hello Africa!'
+        """
+      )
+    result = ourtestdir.runpytest('--pm-xdist-shared-cache')
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}', pm_mismatch_style='diff')
+def profile_test(ourtestdir) -> None:
+    ourtestdir.makefile('.out', test_eq='Hello Africa!', test_match='Hello .*!', test_fail='Hello Africa!')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_eq(expected_out):
+            assert expected_out == 'Hello Africa!'
+
+        def test_match(expected_out):
+            assert expected_out.match('Hello Antarctica!') == True
+
+        def test_fail(expected_out):
+            assert expected_out == 'Hello Americas!'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-profile')
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.re_match_lines([
+        '=+ pytest-matcher profile =+'
+      , 'Regular expressions engine: re'
+      , r'phase +calls +total, ms +mean, us'
+      , r'read +2 +[0-9.]+ +[0-9.]+'
+      , r'compile +1 +[0-9.]+ +[0-9.]+'
+      , r'match +1 +[0-9.]+ +[0-9.]+'
+      , r'eq +2 +[0-9.]+ +[0-9.]+'
+      , r'report +1 +[0-9.]+ +[0-9.]+'
+      , r'total +7 +[0-9.]+'
+      , ''
+      , r'Slowest patterns \(top 10\):'
+      , r' +[0-9.]+ ms  test_\w+\.out \(profile_test\.py::test_\w+\)'
+      ])
+
+    # No profile w/o the option
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.no_fnmatch_line('*pytest-matcher profile*')
+
+
+@pytest.mark.parametrize('engine', ['re', 'regex', 're2'])
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def regex_engine_test(ourtestdir, engine: str) -> None:
+    if engine != 're':
+        pytest.importorskip(engine)
+
+    ourtestdir.makefile('.out', test_match='Hello [A-Z][a-z]+!\nHola .*!', test_multiline='Hello [A-Z][a-z]+!')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import re
+        import pytest
+
+        def test_match(expected_out, monkeypatch):
+            assert expected_out.match('Hello Africa!\\nHola Antarctica!') == True
+            assert expected_out.match(b'Hello Africa!\\nHola Antarctica!') == True
+            assert expected_out.match('Hello Africa!\\nHello Antarctica!') == False
+            # Compiled regexes are cached per engine
+            assert {key[0] for key in expected_out.cache.regexes} == {expected_out.cache.engine.name}
+            assert len(expected_out.cache.regexes) == 2
+            # The least recently used regexes are evicted
+            monkeypatch.setattr('pytest_matcher.plugin._REGEX_CACHE_SIZE', 1)
+            assert expected_out.match('Hello Africa!\\nHola Antarctica!', flags=re.MULTILINE | re.DOTALL) == True
+            assert [key[2] for key in expected_out.cache.regexes] == [re.MULTILINE | re.DOTALL]
+
+        def test_multiline(expected_out):
+            assert expected_out.match('Hola!\\nHello Africa!\\nAdios!', flags=re.MULTILINE | re.DOTALL) == True
+
+        @pytest.mark.on_store(replace_matched_lines=['[0-9]+ ms'])
+        def test_store(expected_out):
+            assert expected_out.match('Hello Africa!\\nDone in 12 ms\\nTotal: 1.5s') == True
+        """
+      )
+
+    result = ourtestdir.runpytest('-o', f'pm-regex-engine={engine}', '--pm-save-patterns', '-k', 'test_store')
+    result.assert_outcomes(skipped=1)
+    assert (ourtestdir.path / 'test_store.out').read_text() == 'Hello Africa!\nDone in [0-9]+ ms\nTotal: 1\\.5s\n'
+
+    result = ourtestdir.runpytest('-o', f'pm-regex-engine={engine}', '--pm-profile')
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines([f'Regular expressions engine: {engine}'])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def inline_flags_regex_engine_test(ourtestdir) -> None:
+    ourtestdir.makefile('.out', test_flags='Hello [A-Z][a-z]+!')
+    # Emulate an engine that doesn't accept flags (like RE2) w/ the `re` module
+    ourtestdir.makeconftest("""
+        import re
+        import pytest
+        from pytest_matcher.plugin import PM_PATTERN_CACHE, _RegexEngine
+
+        @pytest.hookimpl(trylast=True)
+        def pytest_configure(config):
+            config.stash[PM_PATTERN_CACHE].engine = _RegexEngine(re, inline_flags=True, linear=True)
+        """
+      )
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import re
+        import pytest
+
+        def test_flags(expected_out):
+            assert expected_out.match('Hola!\\nHello Africa!', flags=re.MULTILINE | re.DOTALL) == True
+            assert expected_out.match(b'hello africa!', flags=re.IGNORECASE) == True
+            assert [regex.pattern[:6] for regex in expected_out.cache.regexes.values()] == ['(?ms).', b'(?is)H']
+
+            with pytest.raises(pytest.UsageError, match=r"doesn't support re\\.VERBOSE"):
+                expected_out.match('Hello Africa!', flags=re.VERBOSE)
+        """
+      )
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.pytest_ini_options(pm_regex_engine='pcre')
+def bad_regex_engine_test(ourtestdir) -> None:
+    result = ourtestdir.runpytest()
+    result.stderr.fnmatch_lines([
+        "ERROR: 'pm-regex-engine' option have an invalid value `pcre`. Valid values are: `re`, `regex`, `re2`."
+      ])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def stats_json_test(ourtestdir, tmp_path) -> None:
+    ourtestdir.makefile('.out', test_eq='Hello Africa!', test_match='Hello .*!')
+    ourtestdir.makefile('.yaml', test_yaml='name: test')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_eq(expected_out):
+            assert expected_out == 'Hello Americas!'
+
+        def test_match(expected_out):
+            assert expected_out.match('Hello Antarctica!') == True
+
+        def test_yaml(expected_yaml):
+            assert expected_yaml == {'name': 'test'}
+
+        def test_missing(expected_out):
+            assert expected_out == 'Hello Africa!'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-stats-json=stats/matcher.jsonl')
+    result.assert_outcomes(passed=2, failed=1, skipped=1)
+    records = [json.loads(line) for line in (ourtestdir.path / 'stats/matcher.jsonl').read_text().splitlines()]
+    keys = ('test', 'pattern', 'mode', 'outcome', 'pattern_size', 'output_size')
+    assert [tuple(record[key] for key in keys) for record in records] == [
+        ('stats_json_test.py::test_eq', 'test_eq.out', 'eq', 'failed', 13, 15)
+      , ('stats_json_test.py::test_match', 'test_match.out', 'regex', 'passed', 9, 17)
+      , ('stats_json_test.py::test_yaml', 'test_yaml.yaml', 'yaml', 'passed', 10, None)
+      , ('stats_json_test.py::test_missing', 'test_missing.out', 'eq', 'skipped', None, 13)
+      ]
+    # The mismatch report is accounted to the failed comparison
+    assert set(records[0]['durations_ns']) == {'eq', 'read', 'report'}
+    assert set(records[1]['durations_ns']) == {'read', 'compile', 'match'}
+    assert records[1]['regex_engine'] == 're'
+    assert 'regex_engine' not in records[0]
+
+    # A `pytest-xdist` worker passes records to the controller
+    ourtestdir.makeconftest(f"""
+        import json
+        import pytest
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_configure(config):
+            config.workerinput = {{'workerid': 'gw1'}}
+            config.workeroutput = {{}}
+
+        def pytest_unconfigure(config):
+            with open({str(tmp_path / 'workeroutput.json')!r}, 'w') as fd:
+                json.dump(config.workeroutput, fd)
+        """
+      )
+    result = ourtestdir.runpytest('--pm-stats-json=worker.jsonl', '-k', 'test_match')
+    result.assert_outcomes(passed=1)
+    assert not (ourtestdir.path / 'worker.jsonl').exists()
+    records = json.loads((tmp_path / 'workeroutput.json').read_text())['pm_stats_records']
+    assert [(record['test'], record['worker']) for record in records] == [('stats_json_test.py::test_match', 'gw1')]
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}', pm_patterns_archive='patterns.db')
+def archive_save_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_archive(capfd, expected_out):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    # On first run store the pattern into the archive...
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=1)
+    assert (ourtestdir.path / 'patterns.db').exists()
+    assert not (ourtestdir.path / 'test_archive.out').exists()
+
+    # ... and the second run should pass
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.pytest_ini_options(
+    pm_pattern_file_fmt='{module}/{fn}'
+  , pm_patterns_base_dir='expected'
+  , pm_patterns_archive='expected.db'
+  )
+def archive_import_export_test(ourtestdir) -> None:
+    # Write a sample expectations file
+    pattern_file = ourtestdir.path / 'expected' / 'archive_import_export_test' / 'test_archive.out'
+    pattern_file.parent.mkdir(parents=True)
+    pattern_file.write_text('Hello Africa!\n')
+    other_pattern_file = pattern_file.with_name('test_other.out')
+    other_pattern_file.write_text('Hello Asia!\n')
+
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_archive(capfd, expected_out):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+
+        def test_other(expected_out):
+            assert expected_out == 'Hello Asia!\\n'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-archive-import')
+    assert result.ret == 0
+    result.stderr.fnmatch_lines(['*Imported 2 pattern files from *expected* into *expected.db*'])
+
+    # Pattern files aren't needed anymore
+    pattern_file.unlink()
+    other_pattern_file.unlink()
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=2)
+
+    result = ourtestdir.runpytest('--pm-archive-export')
+    assert result.ret == 0
+    assert pattern_file.read_text() == 'Hello Africa!\n'
+    assert other_pattern_file.read_text() == 'Hello Asia!\n'
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}', pm_lint_max_size='1')
+def lint_patterns_test(ourtestdir) -> None:
+    pattern_dir = ourtestdir.path
+    (pattern_dir / 'test_good.out').write_text('Hello [A-Z][a-z]+!\n')
+    (pattern_dir / 'test_invalid.out').write_text('Hello\n[Africa!\n')
+    (pattern_dir / 'test_wildcards.err').write_text('\nHello .*\n.*Africa!\n')
+    (pattern_dir / 'test_nested.out').write_text('Hello\n(\\w+\\s?)*!\n')
+    (pattern_dir / 'test_big.yaml').write_text('x' * 2048)
+
+    result = ourtestdir.runpytest('--pm-lint-patterns')
+    assert result.ret == 1
+    result.stdout.fnmatch_lines([
+        '*test_big.yaml: the pattern file is too big (2048 > 1024 bytes)'
+      , '*test_invalid.out:2: warning: invalid regular expression: unterminated character set'
+      , '*test_nested.out:2: nested quantifiers may cause catastrophic backtracking'
+      , '*test_wildcards.err:2: adjacent wildcards `.* .*` may cause catastrophic backtracking'
+      ])
+    result.stderr.fnmatch_lines(['*Found 3 problems in 3 pattern files (1 warning)'])
+    result.stdout.no_fnmatch_line('*test_good.out*')
+
+    # Literal pattern files may be invalid regular expressions
+    for name in ('test_big.yaml', 'test_nested.out', 'test_wildcards.err'):
+        (pattern_dir / name).unlink()
+    result = ourtestdir.runpytest('--pm-lint-patterns')
+    assert result.ret == 0
+    result.stderr.fnmatch_lines(['*No problems found in * pattern files (1 warning)'])
+
+    (pattern_dir / 'test_invalid.out').unlink()
+    result = ourtestdir.runpytest('--pm-lint-patterns')
+    assert result.ret == 0
+    result.stderr.fnmatch_lines(['*No problems found in * pattern files'])
+
+    (pattern_dir / 'test_nested.out').write_text('(a+)+\n')
+    result = ourtestdir.runpytest('--pm-lint-patterns')
+    assert result.ret == 1
+    result.stderr.fnmatch_lines(['*Found 1 problem in 1 pattern file'])
+
+
+@pytest.mark.pytest_ini_options(pm_lint_max_size='0')
+def bad_lint_max_size_test(ourtestdir) -> None:
+    result = ourtestdir.runpytest()
+    result.stderr.fnmatch_lines([
+        "ERROR: 'pm-lint-max-size' option have an invalid value `0`. Valid values are positive integers."
+      ])
+
+
+@pytest.mark.parametrize('suffix', ['.gz', '.xz'])
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}')
+def compressed_pattern_test(ourtestdir, suffix: str) -> None:
+    # Write a sample compressed expectations file
+    compress = gzip.compress if suffix == '.gz' else lzma.compress
+    (ourtestdir.path / f'test_compressed.out{suffix}').write_bytes(compress(b'Hello Africa!\n'))
+
+    # Write sample tests
+    ourtestdir.makepyfile("""
+        def test_compressed(capfd, expected_out):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+            assert expected_out.match(stdout) == True
+            assert expected_out != 'Hello Asia!\\n'
+        """
+      )
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.parametrize('compression', ['gz', 'xz'])
+def compressed_save_test(ourtestdir, compression: str) -> None:
+    ourtestdir.makefile(
+        '.ini'
+      , pytest=f"""
+            [pytest]
+            pm-patterns-base-dir = .
+            pm-pattern-file-fmt = {{fn}}
+            pm-compression = {compression}
+            pm-compression-level = 1
+        """
+      )
+    # Stale uncompressed pattern file must be replaced
+    ourtestdir.makefile('.out', test_compressed='Hello Asia!')
+
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_compressed(capfd, expected_out):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=1)
+    assert not (ourtestdir.path / 'test_compressed.out').exists()
+    assert (ourtestdir.path / f'test_compressed.out.{compression}').exists()
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}', pm_digest_index='true')
+def digest_index_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pytest
+        import pytest_matcher.plugin
+
+        def test_digest(capfd, expected_out, monkeypatch):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            # Make sure the pattern file isn't read when the output matches
+            with monkeypatch.context() as m:
+                m.setattr(pytest_matcher.plugin._DirectoryStore, 'open_text', None)
+                assert expected_out == stdout
+            assert expected_out != 'Hello Asia!\\n'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=1)
+    # The digest is recorded in the `pytest` cache, not next to the pattern file
+    assert len(list((ourtestdir.path / '.pytest_cache' / 'd' / 'pytest-matcher-digests').iterdir())) == 1
+    assert sorted(p.name for p in ourtestdir.path.iterdir() if p.name.startswith('test_digest')) == [
+        'test_digest.out'
+      ]
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+    ourtestdir.makepyfile("""
+        def test_digest(capfd, expected_out):
+            print('Hello Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    # A digest of the pattern file edited w/ the same size must be ignored
+    pattern_file = ourtestdir.path / 'test_digest.out'
+    stat = pattern_file.stat()
+    pattern_file.write_text('Hello Europe!\n')
+    os.utime(pattern_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert pattern_file.stat().st_size == stat.st_size
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(['E         Hello Europe!↵'])
+
+    # Stale digest must be ignored
+    pattern_file.write_text('Hello Asia!\n')
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        'E         ---[BEGIN expected output]---'
+      , 'E         Hello Asia!↵'
+      , 'E         ---[END expected output]---'
+      ])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}{callspec}')
+def save_patterns_batches_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pathlib
+        import pytest
+
+        @pytest.mark.parametrize('n', range(3))
+        def test_save(capfd, expected_out, monkeypatch, n):
+            monkeypatch.setattr('pytest_matcher.plugin._WRITE_BATCH_MAX_ITEMS', 2)
+            # Saved patterns are written once the batch is full
+            assert pathlib.Path('test_save[0].out').exists() == (n == 2)
+            print(f'Hello #{n}')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns', '-p', 'no:randomly')
+    result.assert_outcomes(skipped=3)
+    # The rest is written at the session end
+    assert [(ourtestdir.path / f'test_save[{n}].out').read_text() for n in range(3)] == [
+        'Hello #0\n'
+      , 'Hello #1\n'
+      , 'Hello #2\n'
+      ]
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}{callspec}', pm_dedup_patterns='true')
+def dedup_patterns_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.parametrize('n', range(16))
+        def test_dedup(capfd, expected_out, n):
+            print('Hello Africa!' if n else 'Hi Africa!')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    # NOTE Batched saves write pattern files w/ the same content concurrently.
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=16)
+
+    inodes = [(ourtestdir.path / f'test_dedup[{n}].out').stat().st_ino for n in range(16)]
+    # Identical content is stored once
+    assert len(set(inodes[1:])) == 1
+    assert inodes[0] != inodes[1]
+    objects = [p for p in (ourtestdir.path / '.objects').rglob('*') if p.is_file()]
+    assert sorted(p.stat().st_ino for p in objects) == sorted({inodes[0], inodes[1]})
+
+    result = ourtestdir.runpytest('--pm-prewarm')
+    result.assert_outcomes(passed=16)
+
+    # Deduplicated content isn't an unused pattern file
+    result = ourtestdir.runpytest('--pm-reveal-unused-files')
+    assert '.objects' not in result.stdout.str()
+
+    # Objects not linked by pattern files anymore are removed after saving
+    (ourtestdir.path / 'test_dedup[0].out').unlink()
+    result = ourtestdir.runpytest('--pm-save-patterns', '--deselect', 'dedup_patterns_test.py::test_dedup[0]')
+    result.assert_outcomes(skipped=15, deselected=1)
+    objects = [p for p in (ourtestdir.path / '.objects').rglob('*') if p.is_file()]
+    assert [p.stat().st_ino for p in objects] == [inodes[1]]
+    assert len(list((ourtestdir.path / '.objects').iterdir())) == 1
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{module}/{shard}/{fn}{callspec}')
+def sharded_layout_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.parametrize('n', range(8))
+        def test_sharded(capfd, expected_out, n):
+            print(f'Hello #{n}')
+            stdout, _ = capfd.readouterr()
+            assert expected_out == stdout
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=8)
+
+    # Pattern files are spread across shards derived from the pattern filename parts
+    for n in range(8):
+        key = f'sharded_layout_test//test_sharded/[{n}]/'
+        shard = hashlib.blake2b(key.encode(), digest_size=1).hexdigest()
+        assert (ourtestdir.path / 'sharded_layout_test' / shard / f'test_sharded[{n}].out').exists()
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=8)
+
+    result = ourtestdir.runpytest('--pm-reveal-unused-files')
+    assert '.out' not in result.stdout.str()
+
+
+def lazy_imports_test(pytester: pytest.Pytester) -> None:
+    # Modules needed only by some fixtures, options, or mismatch reports are not imported
+    # with the plugin (some of them might be imported by `pytest` itself, though)
+    lazy_modules = ['_hashlib', 'concurrent.futures', 'difflib', 'gzip', 'hashlib', 'lzma', 'mmap', 'sqlite3', 'yaml']
+    result = pytester.runpython_c(
+        'import sys, pytest; imported = set(sys.modules); import pytest_matcher.plugin; '
+        f'print(sorted(set({lazy_modules!r}) & (sys.modules.keys() - imported)))'
+      )
+    assert result.ret == 0
+    assert result.stdout.str().strip() == '[]'
+
+
+def expected_bytes_test(ourtestdir, monkeypatch) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import os
+        import pytest
+
+        DATA = bytes(range(256)) * 4
+
+        def test_bytes(expected_bytes):
+            assert expected_bytes == DATA
+
+        def test_memoryview(expected_bytes):
+            assert expected_bytes == memoryview(DATA)
+
+        def test_mismatch(expected_bytes):
+            data = bytearray(DATA)
+            if os.environ.get('CHANGE_OUTPUT'):
+                data[0x123] = 0
+            assert expected_bytes == data
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=3)
+    assert (ourtestdir.path / 'expected_bytes_test' / 'test_bytes.bin').read_bytes() == bytes(range(256)) * 4
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=3)
+
+    monkeypatch.setenv('CHANGE_OUTPUT', '1')
+    result = ourtestdir.runpytest('-k', 'test_mismatch')
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        'E         First difference at offset 291 (0x123), expected size 1024, actual size 1024.'
+      , 'E         ---[BEGIN actual output]---'
+      , 'E         00000120  20 21 22 00 24 25 26 27 28 29 2a 2b 2c 2d 2e 2f  | !".$%&\'()*+,-./|'
+      , 'E         ---[END actual output]---'
+      , 'E         ---[BEGIN expected output]---'
+      , 'E         00000120  20 21 22 23 24 25 26 27 28 29 2a 2b 2c 2d 2e 2f  | !"#$%&\'()*+,-./|'
+      , 'E         ---[END expected output]---'
+      ])
+
+
+def expected_bytes_empty_and_compressed_test(ourtestdir, expectdir) -> None:
+    # Write pattern files
+    (expectdir.path / 'test_empty.bin').write_bytes(b'')
+    (expectdir.path / 'test_compressed.bin.gz').write_bytes(gzip.compress(b'\x00\x01\x02'))
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        def test_empty(expected_bytes):
+            assert expected_bytes == b''
+
+        def test_compressed(expected_bytes):
+            assert expected_bytes == b'\\x00\\x01\\x02'
+
+        def test_missing(expected_bytes):
+            assert expected_bytes == b'\\x00'
+        """
+      )
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=2, skipped=1)
+
+
+def bytes_regex_match_test(ourtestdir, expectdir) -> None:
+    # Write a sample output and pattern files
+    (ourtestdir.path / 'output.log').write_bytes(b'Hello Africa!\r\nHello Asia!\r\n')
+    (ourtestdir.path / 'other.log').write_bytes('Hello Éurope!\n'.encode('latin-1'))
+    expectdir.makepatternfile('.out', test_single_line='Hello .*!\nHello As.*')
+    expectdir.makepatternfile('.out', test_multi_line='Africa\nHello As')
+    expectdir.makepatternfile('.out', test_encoding='Hello Éurope!')
+    expectdir.makepatternfile('.out', test_mismatch='Hello Europe!')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pathlib
+        import re
+
+        def test_single_line(expected_out):
+            assert expected_out.match(pathlib.Path('output.log')) == True
+            assert expected_out.match(b'Hello Africa! Hello Asia!') == True
+
+        def test_multi_line(expected_out):
+            assert expected_out.match(pathlib.Path('output.log'), flags=re.MULTILINE) == True
+
+        def test_encoding(expected_out):
+            assert expected_out.match(pathlib.Path('other.log'), encoding='latin-1') == True
+
+        def test_mismatch(expected_out):
+            assert expected_out.match(pathlib.Path('output.log')) == True
+        """
+      )
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=3, failed=1)
+    result.stdout.fnmatch_lines([
+        "E         The test output doesn't match the expected regex."
+      , 'E         ---[BEGIN actual output]---'
+      , 'E         Hello Africa!'
+      , 'E         Hello Asia!'
+      , 'E         ---[END actual output]---'
+      ])
+
+
+@pytest.mark.pytest_ini_options(pm_bytes_encoding='utf-16')
+def bytes_regex_bad_encoding_test(ourtestdir) -> None:
+    result = ourtestdir.runpytest()
+    result.stderr.fnmatch_lines(['ERROR: Encoding `utf-16` is unknown or not ASCII-compatible'])
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{fn}', pm_normalize='eol trailing-whitespace')
+def normalize_test(ourtestdir, monkeypatch) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import os
+        import pathlib
+        import pytest
+        import tempfile
+
+        COLOR = os.environ.get('COLOR', '31')
+        TMPDIR = os.path.realpath(tempfile.gettempdir())
+
+        def test_ini(expected_out):
+            assert expected_out == 'Hello Africa!  \\r\\nHola Antarctica!\\t\\r\\n'
+
+        @pytest.mark.normalize('ansi', 'control', 'tmp-paths', 'trailing-whitespace')
+        def test_marker(expected_out):
+            output = (
+                f'\\x1b[{COLOR}mHello\\x1b[0m   \\x1b[0m\\x07\\n'
+                f'Saved to {TMPDIR}/pytest-of-me/pytest-42/out.txt\\n'
+              )
+            assert expected_out == output
+            assert expected_out.match(output) == True
+
+        @pytest.mark.normalize()
+        def test_disabled(expected_out):
+            assert expected_out == 'Hello Americas!  \\n'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=3)
+    pattern_dir = ourtestdir.path
+    assert (pattern_dir / 'test_ini.out').read_bytes() == b'Hello Africa!\nHola Antarctica!\n'
+    assert (pattern_dir / 'test_marker.out').read_text() == 'Hello\nSaved to <TMP>/out.txt\n'
+    assert (pattern_dir / 'test_disabled.out').read_text() == 'Hello Americas!  \n'
+
+    # Normalized outputs match saved patterns regardless of escape sequences
+    monkeypatch.setenv('COLOR', '1;32')
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=3)
+
+
+@pytest.mark.pytest_ini_options(pm_normalize='eol tabs')
+def bad_normalize_test(ourtestdir) -> None:
+    result = ourtestdir.runpytest()
+    result.stderr.fnmatch_lines([
+        "ERROR: 'pm-normalize' option got invalid normalization step: 'tabs'. Valid steps are: *"
+      ])
+
+
+@pytest.mark.parametrize(
+    ('libyaml', 'expected_loader')
+  , [
+        pytest.param('true', 'CSafeLoader' if yaml.__with_libyaml__ else 'SafeLoader', id='libyaml')
+      , pytest.param('false', 'SafeLoader', id='pure-python')
+      ]
+  )
+def yaml_loader_test(libyaml, expected_loader, ourtestdir, expectdir) -> None:
+    ourtestdir.makefile('.yaml', result='key: [1, 2, 3]')
+    expectdir.makepatternfile('.yaml', test_yaml='key:\n- 1\n- 2\n- 3')
+    # Write a sample test
+    ourtestdir.makepyfile(f"""
+        import pathlib
+
+        def test_yaml(expected_yaml):
+            assert expected_yaml.loader.__name__ == '{expected_loader}'
+            assert expected_yaml == pathlib.Path('result.yaml')
+        """
+      )
+
+    result = ourtestdir.runpytest('-o', f'pm-yaml-libyaml={libyaml}')
+    result.assert_outcomes(passed=1)
+
+
+@pytest.mark.pytest_ini_options(pm_pattern_file_fmt='{module}/{fn}')
+def yaml_parsed_cache_test(ourtestdir, expectdir) -> None:
+    ourtestdir.makefile(
+        '.yaml'
+      , result_1='key: [1, 2, 3]'
+      , result_2='key: [1, 2, 3]'
+      , result_3='key: [3, 2, 1]'
+      , result_4='key: [3, 2, 1, 0]'
+      )
+    expectdir.makepatternfile('.yaml', test_yaml='key: [1, 2, 3]')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import os
+        import pathlib
+        import pytest
+        import yaml
+        from pytest_matcher.plugin import PM_PATTERN_CACHE
+
+        def _rewrite(path, content, mtime_delta):
+            stat = path.stat()
+            path.write_text(content)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_delta))
+
+        @pytest.mark.parametrize('n', [1, 2])
+        def test_yaml(expected_yaml, n):
+            assert expected_yaml == pathlib.Path(f'result_{n}.yaml')
+            # Change the content, but keep the modification time:
+            # the next comparison must use the cached document.
+            _rewrite(expected_yaml.expected_file, 'key: [3, 2, 1]', 0)
+
+        def test_read_only(request, expected_yaml):
+            path = expected_yaml.expected_file.with_name('test_yaml.yaml')
+            document = next(request.config.stash[PM_PATTERN_CACHE].iter_documents(path, yaml.safe_load_all))
+            with pytest.raises(TypeError, match='read-only'):
+                document['key'].append(4)
+            with pytest.raises(TypeError, match='read-only'):
+                document['other'] = 1
+            assert document == {'key': [1, 2, 3]}
+
+        def test_yaml_modified(expected_yaml):
+            # Point to the same expected file and touch it
+            expected_yaml.expected_file = expected_yaml.expected_file.with_name('test_yaml.yaml')
+            _rewrite(expected_yaml.expected_file, 'key: [3, 2, 1]', 1_000_000_000)
+            assert expected_yaml == pathlib.Path('result_3.yaml')
+
+        def test_yaml_resized(expected_yaml):
+            # Change the size, but keep the modification time
+            expected_yaml.expected_file = expected_yaml.expected_file.with_name('test_yaml.yaml')
+            _rewrite(expected_yaml.expected_file, 'key: [3, 2, 1, 0]', 0)
+            assert expected_yaml == pathlib.Path('result_4.yaml')
+        """
+      )
+
+    result = ourtestdir.runpytest('-p', 'no:randomly')
+    result.assert_outcomes(passed=5)
+
+    # W/o the cache, the second test sees the modified expected file
+    expectdir.makepatternfile('.yaml', test_yaml='key: [1, 2, 3]')
+    result = ourtestdir.runpytest('-o', 'pm-documents-cache-size=0', '-k', 'test_yaml and not modified and not resized')
+    result.assert_outcomes(passed=1, failed=1)
+
+
+def yaml_multi_document_test(ourtestdir, expectdir) -> None:
+    ourtestdir.makefile(
+        '.yaml'
+      , result_same='a: 1\n---\nspec:\n  items: [{name: x}, {name: y}]\n'
+      , result_diff='a: 1\n---\nspec:\n  items: [{name: x}, {name: z}]\n'
+      , result_more='a: 1\n---\nspec:\n  items: [{name: x}, {name: y}]\n---\nextra: true\n'
+      )
+    expectdir.makepatternfile('.yaml', test_yaml='a: 1\n---\nspec:\n  items: [{name: x}, {name: y}]')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pathlib
+        import pytest
+
+        @pytest.mark.parametrize('result', ['same', 'diff', 'more'])
+        def test_yaml(expected_yaml, result):
+            assert expected_yaml == pathlib.Path(f'result_{result}.yaml')
+        """
+      )
+
+    result = ourtestdir.runpytest('-o', 'pm-pattern-file-fmt={module}/{fn}')
+    result.assert_outcomes(passed=1, failed=2)
+    result.stdout.fnmatch_lines([
+        'E         document #2: spec.items[1].name'
+      , "E           - 'y'"
+      , "E           + 'z'"
+      , '*'
+      , 'E         document #3: <root>'
+      , 'E           - <missing>'
+      , "E           + {'extra': True}"
+      ])
+
+
+def yaml_unordered_lists_test(ourtestdir, expectdir) -> None:
+    ourtestdir.makefile(
+        '.yaml'
+      , result_same='items: [{name: b, tags: [y, x]}, {name: a, tags: [x]}, 1, 1]'
+      , result_diff='items: [{name: b, tags: [y, x]}, {name: c, tags: [x]}, 1, 2]'
+      )
+    expectdir.makepatternfile('.yaml', test_yaml='items: [1, {name: a, tags: [x]}, 1, {tags: [x, y], name: b}]')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pathlib
+        import pytest
+
+        @pytest.mark.unordered_lists
+        @pytest.mark.parametrize('result', ['same', 'diff'])
+        def test_yaml(expected_yaml, result):
+            assert expected_yaml == pathlib.Path(f'result_{result}.yaml')
+
+        @pytest.mark.parametrize('result', ['same'])
+        def test_ordered_yaml(expected_yaml, result):
+            expected_yaml.expected_file = expected_yaml.expected_file.with_name('test_yaml.yaml')
+            assert expected_yaml == pathlib.Path(f'result_{result}.yaml')
+        """
+      )
+
+    result = ourtestdir.runpytest('-o', 'pm-pattern-file-fmt={module}/{fn}')
+    result.assert_outcomes(passed=1, failed=2)
+    result.stdout.fnmatch_lines([
+        'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         items[*]'
+      , "E           - {'name': 'a', 'tags': ['x']}"
+      , 'E           + <missing>'
+      , 'E         items[*]'
+      , 'E           - 1'
+      , 'E           + <missing>'
+      , 'E         items[*]'
+      , 'E           - <missing>'
+      , "E           + {'name': 'c', 'tags': ['x']}"
+      , 'E         items[*]'
+      , 'E           - <missing>'
+      , 'E           + 2'
+      , 'E         ---[END expected vs actual differences]---'
+      ])
+
+    # Enable unordered lists for all tests
+    result = ourtestdir.runpytest('-o', 'pm-pattern-file-fmt={module}/{fn}', '-o', 'pm-unordered-lists=true')
+    result.assert_outcomes(passed=2, failed=1)
+
+
+def yaml_unordered_sets_test(ourtestdir, expectdir) -> None:
+    ourtestdir.makefile(
+        '.yaml'
+      , result_same='items: [1, !!set {b, a}]'
+      , result_diff='items: [1, !!set {c, a}]'
+      )
+    expectdir.makepatternfile('.yaml', test_yaml='items: [!!set {a, b}, 1]')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import pathlib
+        import pytest
+
+        @pytest.mark.unordered_lists
+        @pytest.mark.parametrize('result', ['same', 'diff'])
+        def test_yaml(expected_yaml, result):
+            assert expected_yaml == pathlib.Path(f'result_{result}.yaml')
+        """
+      )
+
+    result = ourtestdir.runpytest('-o', 'pm-pattern-file-fmt={module}/{fn}')
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         items[*]'
+      ])
+
+
+def yaml_in_memory_test(ourtestdir) -> None:
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import os
+        import pytest
+
+        RESULT = {'name': 'test', 'items': [1, 2, {'nested': 'значение'}]}
+
+        def test_object(expected_yaml):
+            result = dict(RESULT, name='changed') if os.environ.get('CHANGE_OUTPUT') else RESULT
+            assert expected_yaml == result
+
+        def test_string(expected_yaml):
+            assert expected_yaml == 'a: 1\\n---\\nb: [2, 3]\\n'
+        """
+      )
+
+    # Save patterns: an object gets dumped, a string is stored as is
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=2)
+    pattern_dir = ourtestdir.path / 'yaml_in_memory_test'
+    assert yaml.safe_load((pattern_dir / 'test_object.yaml').read_text(encoding='utf-8')) == {
+        'name': 'test'
+      , 'items': [1, 2, {'nested': 'значение'}]
+      }
+    assert (pattern_dir / 'test_string.yaml').read_text() == 'a: 1\n---\nb: [2, 3]\n'
+
+    # Saving the same content again leaves pattern files untouched
+    stats = {path: path.stat() for path in pattern_dir.iterdir()}
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=2)
+    for path, stat in stats.items():
+        assert (path.stat().st_ino, path.stat().st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=2)
+
+    with pytest.MonkeyPatch.context() as m:
+        m.setenv('CHANGE_OUTPUT', '1')
+        result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        'E         Comparing the test result with the expected YAML file (`*test_object.yaml`):'
+      , 'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         name'
+      , "E           - 'test'"
+      , "E           + 'changed'"
+      , 'E         ---[END expected vs actual differences]---'
+      ])
+
+
+def expected_json_test(ourtestdir, monkeypatch) -> None:
+    ourtestdir.makefile('.json', result='{"items": [{"name": "a"}, {"name": "b"}]}')
+    # Write a sample test
+    ourtestdir.makepyfile("""
+        import os
+        import pathlib
+
+        def test_file(expected_json):
+            assert expected_json == pathlib.Path('result.json')
+
+        def test_object(expected_json):
+            name = 'c' if os.environ.get('CHANGE_OUTPUT') else 'b'
+            assert expected_json == {'items': [{'name': 'a'}, {'name': name}], 'unicode': 'значение'}
+
+        def test_string(expected_json):
+            assert expected_json == '[1, 2, 3]'
+        """
+      )
+
+    result = ourtestdir.runpytest('--pm-save-patterns')
+    result.assert_outcomes(skipped=3)
+    pattern_dir = ourtestdir.path / 'expected_json_test'
+    assert (pattern_dir / 'test_object.json').read_text(encoding='utf-8').startswith('{\n  "items": [\n')
+    assert (pattern_dir / 'test_string.json').read_text() == '[1, 2, 3]'
+
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=3)
+
+    monkeypatch.setenv('CHANGE_OUTPUT', '1')
+    result = ourtestdir.runpytest()
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.fnmatch_lines([
+        'E         Comparing the test result with the expected JSON file (`*test_object.json`):'
+      , 'E         ---[BEGIN expected vs actual differences]---'
+      , 'E         items[1].name'
+      , "E           - 'b'"
+      , "E           + 'c'"
+      , 'E         ---[END expected vs actual differences]---'
+      ])
+
+    # Unused JSON pattern files are revealed as well
+    (pattern_dir / 'test_unused.json').write_text('{}')
+    result = ourtestdir.runpytest('--pm-reveal-unused-files')
+    assert str(pattern_dir / 'test_unused.json') in result.stdout.lines
+    assert str(pattern_dir / 'test_object.json') not in result.stdout.lines